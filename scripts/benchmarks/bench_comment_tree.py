@@ -0,0 +1,66 @@
+"""
+Compare the sequential recursive comment walk against the BFS fetcher.
+
+    python scripts/benchmarks/bench_comment_tree.py --sizes 50 200 800
+
+Both run against the local stub server; the output reports wall-clock fetch
+time per tree size.
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from hn_loader import HNClient, fetch_comment_tree, render_comment_thread  # noqa: E402
+from stub_hn_server import STORY_ID, StubHNServer, build_story_tree  # noqa: E402
+
+
+async def sequential_walk(client: HNClient, comment_id: int) -> str:
+    # the previous implementation: one awaited request per comment
+    comment = await client.get_comment(comment_id)
+    result = '<comment>\n<content>\n' + (comment.text or 'no content') + '</content>\n'
+    for nested_comment_id in comment.kids:
+        result += await sequential_walk(client, nested_comment_id) + '\n'
+    return result + '</comment>'
+
+
+async def run(sizes: List[int], latency: float, max_in_flight: int) -> None:
+    print(f"{'comments':>10} {'sequential (s)':>16} {'bfs (s)':>10} {'speedup':>9}")
+    for size in sizes:
+        items = build_story_tree(size)
+        with StubHNServer(items, latency=latency) as server:
+            client = HNClient(base_url=server.base_url)
+            story = await client.get_story(STORY_ID)
+            assert story is not None
+
+            start = time.perf_counter()
+            sequential = [await sequential_walk(client, i) for i in story.kids]
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            comments = await fetch_comment_tree(
+                client, story.kids, max_in_flight=max_in_flight, max_nodes=None
+            )
+            bfs = [render_comment_thread(comments, i) for i in story.kids]
+            bfs_time = time.perf_counter() - start
+
+            await client.close()
+
+        assert sequential == bfs, "BFS output differs from the sequential walk"
+        print(
+            f"{size:>10} {sequential_time:>16.2f} {bfs_time:>10.2f} "
+            f"{sequential_time / bfs_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.latency, args.max_in_flight))
@@ -0,0 +1,73 @@
+"""
+Measure how long it takes to enqueue cron tasks one by one vs in bulk.
+
+    DB_URL=postgresql://... DB_SCHEMA=bench python scripts/benchmarks/bench_cron_enqueue.py --count 10000
+
+Needs a reachable Postgres. The tasks are written to DB_SCHEMA (migrated on
+start) and deleted again at the end of the run.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.parent))
+
+from psycopg.sql import SQL, Identifier  # noqa: E402
+
+from src.cron.repository import CronRepository, NewCronTask  # noqa: E402
+from src.database import Database  # noqa: E402
+from src.migrations.runner import MigrationRunner  # noqa: E402
+
+TASK_ID = "bench_cron_enqueue"
+
+
+async def run(count: int) -> None:
+    schema = os.environ.get("DB_SCHEMA", "bench")
+    db = Database(os.environ["DB_URL"])
+    await MigrationRunner(db, schema).apply()
+    repository = CronRepository(db, schema)
+
+    expected_by = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    new_tasks = [
+        NewCronTask(task_id=TASK_ID, payload={"index": index}, expected_by=expected_by)
+        for index in range(count)
+    ]
+
+    start = time.perf_counter()
+    for task in new_tasks:
+        await repository.create_task(task.task_id, task.payload, task.expected_by)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    created = await repository.create_tasks(new_tasks)
+    bulk_time = time.perf_counter() - start
+    assert [task.payload["index"] for task in created] == list(range(count))
+
+    async with db.aget_session(None) as session:
+        await session.execute(
+            SQL("DELETE FROM {0} WHERE task_id = %s").format(
+                Identifier(schema, CronRepository.TABLE_NAME)
+            ),
+            (TASK_ID,),
+        )
+        await session.commit()
+
+    print(f"{'mode':>8} {'tasks':>8} {'time (s)':>10} {'tasks/s':>10}")
+    print(f"{'single':>8} {count:>8} {single_time:>10.2f} {count / single_time:>10.0f}")
+    print(f"{'bulk':>8} {count:>8} {bulk_time:>10.2f} {count / bulk_time:>10.0f}")
+    print(f"speedup: {single_time / bulk_time:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.count))
+
+
+if __name__ == "__main__":
+    main()
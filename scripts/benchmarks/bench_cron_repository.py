@@ -0,0 +1,162 @@
+"""
+Measure the per-call client overhead of CronRepository: composing the SQL on
+every call vs rendering it once per instance, and mapping rows to CronTask with
+pydantic validation (what the repository does) vs `model_construct`.
+
+    python scripts/benchmarks/bench_cron_repository.py --rows 1000
+    DB_URL=postgresql://... DB_SCHEMA=bench python scripts/benchmarks/bench_cron_repository.py
+
+With DB_URL set, also times get_by_id round trips with and without prepared
+statements.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import pathlib
+import sys
+import time
+import timeit
+import uuid
+from typing import Any, Callable
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.parent))
+
+from psycopg.sql import SQL, Identifier, Placeholder  # noqa: E402
+
+from src.cron.repository import CronRepository, CronTask, _task_row  # noqa: E402
+
+SCHEMA = "bench"
+
+
+def per_call_us(fn: Callable[[], Any], number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def compose_claim_query() -> bytes:
+    """The claim query as built on every call before."""
+    return (
+        SQL(
+            """
+            UPDATE {0} AS entity
+            SET status = %(processing)s, claimed_by = %(worker_id)s
+            WHERE entity.id IN (
+                SELECT due.id FROM {0} AS due
+                WHERE due.status = %(created)s AND due.expected_by <= %(now)s
+                AND {2}
+                ORDER BY due.expected_by
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {1}
+            """
+        )
+        .format(
+            Identifier(SCHEMA, CronRepository.TABLE_NAME),
+            SQL(" ,").join(
+                [
+                    SQL("entity.{0}").format(Identifier(col))
+                    for col in CronTask.model_fields.keys()
+                ]
+            ),
+            SQL("1=1"),
+        )
+        .as_bytes(None)
+    )
+
+
+def compose_update_status_query() -> bytes:
+    return (
+        SQL("UPDATE {0} SET {1} WHERE id = %s")
+        .format(
+            Identifier(SCHEMA, CronRepository.TABLE_NAME),
+            SQL(", ").join(
+                [
+                    SQL("{0} = {1}").format(Identifier(col), Placeholder())
+                    for col in ["status", "updated_on"]
+                ]
+            ),
+        )
+        .as_bytes(None)
+    )
+
+
+def bench_queries(number: int) -> None:
+    repository = CronRepository(None, SCHEMA)  # type: ignore[arg-type]
+    claim = getattr(repository, "_CronRepository__claim_queries")
+    update_status = getattr(repository, "_CronRepository__update_status_query")
+    print(f"{'query':>14} {'before (us)':>12} {'after (us)':>12}")
+    for name, before, after in [
+        ("claim", compose_claim_query, lambda: claim[False]),
+        ("update_status", compose_update_status_query, lambda: update_status),
+    ]:
+        print(f"{name:>14} {per_call_us(before, number):>12.2f} {per_call_us(after, number):>12.2f}")
+
+
+def bench_rows(rows: int, number: int) -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    names = list(CronTask.model_fields.keys())
+    values = [
+        (uuid.uuid4(), now, now, now, "generate_article", {"story": i, "tags": ["a", "b"]}, "CREATED", None, None, 0)
+        for i in range(rows)
+    ]
+    def validated() -> None:
+        # what class_row(CronTask) does for every row
+        for row in values:
+            CronTask(**dict(zip(names, row)))
+
+    def constructed() -> None:
+        for row in values:
+            record = dict(zip(names, row))
+            record["status"] = CronTask.TaskStatusEnum(record["status"])
+            CronTask.model_construct(**record)
+
+    validated_us = per_call_us(validated, number) / rows
+    constructed_us = per_call_us(constructed, number) / rows
+    print(f"\n{'row mapping':>14} {'validated (us)':>15} {'construct (us)':>15}")
+    print(f"{'per row':>14} {validated_us:>15.2f} {constructed_us:>15.2f}")
+
+
+async def bench_db(number: int) -> None:
+    from src.database import Database
+    from src.migrations.runner import MigrationRunner
+
+    schema = os.environ.get("DB_SCHEMA", SCHEMA)
+    db = Database(os.environ["DB_URL"])
+    await MigrationRunner(db, schema).apply()
+    repository = CronRepository(db, schema)
+    task = await repository.create_task("bench_cron_repository", {}, datetime.datetime.now(datetime.timezone.utc))
+    query = getattr(repository, "_CronRepository__get_by_id_query")
+
+    print(f"\n{'get_by_id':>14} {'per call (us)':>14}")
+    for prepare in (False, True):
+        async with db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=_task_row)
+            await cursor.execute(query, (task.id,), prepare=prepare)
+            start = time.perf_counter()
+            for _ in range(number):
+                await cursor.execute(query, (task.id,), prepare=prepare)
+                await cursor.fetchone()
+            elapsed = time.perf_counter() - start
+        print(f"{'prepared' if prepare else 'unprepared':>14} {elapsed / number * 1e6:>14.1f}")
+
+    async with db.aget_session(None) as session:
+        await session.execute(
+            SQL("DELETE FROM {0} WHERE id = %s").format(Identifier(schema, CronRepository.TABLE_NAME)), (task.id,)
+        )
+        await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--number", type=int, default=2_000)
+    args = parser.parse_args()
+    bench_queries(args.number * 10)
+    bench_rows(args.rows, max(args.number // 100, 1))
+    if os.environ.get("DB_URL"):
+        asyncio.run(bench_db(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the previous page extraction against the local content extractor.
+
+    python scripts/benchmarks/bench_extraction.py --pages path/to/saved/pages
+
+`--pages` holds saved pages, either `*.html` files or the `*.json` entries the
+page fetcher keeps under `.cache/hn_loader/pages`. For every page the previous
+approach is timed up to the prompt it sent to gpt-4o-mini (`html.parser` plus
+the whole <body> text), the new one up to the text it puts in the article
+prompt. Token counts use the loader's tiktoken encoding.
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import sys
+import time
+from typing import List, Tuple
+
+import tiktoken
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from content_extractor import PARSER, ContentExtractor, body_text, truncate_paragraphs  # noqa: E402
+
+SOURCE_MAX_TOKENS = 4000
+EXTRACTION_MIN_CONFIDENCE = 0.5
+
+
+def load_pages(directory: pathlib.Path) -> List[Tuple[str, str]]:
+    pages = []
+    for path in sorted(directory.glob("*.html")):
+        pages.append((path.name, path.read_text(errors="replace")))
+    for path in sorted(directory.glob("*.json")):
+        with open(path) as f:
+            pages.append((path.name, json.load(f)["text"]))
+    return pages
+
+
+def run(directory: pathlib.Path) -> None:
+    encoder = tiktoken.encoding_for_model("gpt-4o-mini")
+    extractor = ContentExtractor()
+    pages = load_pages(directory)
+    if not pages:
+        raise SystemExit(f"no pages found in {directory}")
+
+    old_times, new_times, old_tokens, new_tokens = [], [], [], []
+    fallbacks = 0
+    fallback_tokens = 0
+    print(f"parser: {PARSER}")
+    print(f"{'page':<40} {'old ms':>8} {'new ms':>8} {'old tok':>8} {'new tok':>8} {'conf':>5}")
+    for name, html in pages:
+        start = time.perf_counter()
+        old_text = body_text(html)
+        old_times.append(time.perf_counter() - start)
+        old_tokens.append(len(encoder.encode(old_text)))
+
+        start = time.perf_counter()
+        extraction = extractor.extract(html)
+        text = truncate_paragraphs(extraction.text, encoder, SOURCE_MAX_TOKENS)
+        new_times.append(time.perf_counter() - start)
+        new_tokens.append(len(encoder.encode(text)))
+        if extraction.confidence < EXTRACTION_MIN_CONFIDENCE:
+            # the fallback still pays an LLM call on the full body
+            fallbacks += 1
+            fallback_tokens += old_tokens[-1]
+
+        print(
+            f"{name[:40]:<40} {old_times[-1] * 1000:>8.1f} {new_times[-1] * 1000:>8.1f} "
+            f"{old_tokens[-1]:>8} {new_tokens[-1]:>8} {extraction.confidence:>5.2f}"
+        )
+
+    print()
+    print(f"pages: {len(pages)}, LLM fallbacks: {fallbacks}")
+    print(
+        f"median time: old {statistics.median(old_times) * 1000:.1f} ms (+ one LLM call per page), "
+        f"new {statistics.median(new_times) * 1000:.1f} ms"
+    )
+    print(
+        f"extraction LLM calls: old {len(pages)} ({sum(old_tokens)} input tokens), "
+        f"new {fallbacks} ({fallback_tokens} input tokens)"
+    )
+    print(f"source tokens put in the article prompt by the local extractor: {sum(new_tokens)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=pathlib.Path, required=True)
+    args = parser.parse_args()
+    run(args.pages)
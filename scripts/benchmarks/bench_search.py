@@ -0,0 +1,130 @@
+"""
+Measure /search latency on a seeded database: seeds synthetic articles,
+then times NewsRepository.search for a few queries at several page depths.
+
+    DB_URL=postgresql://... DB_SCHEMA=bench python scripts/benchmarks/bench_search.py --articles 100000
+
+Run it against a throwaway schema, the seeded articles are deleted at the end
+(pass --keep to reuse them on the next run with --articles 0).
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.parent))
+
+from psycopg.sql import SQL, Identifier  # noqa: E402
+
+from src.database import Database  # noqa: E402
+from src.migrations.runner import MigrationRunner  # noqa: E402
+from src.news.repository import NewsItem, NewsRepository, SearchKey  # noqa: E402
+
+SCHEMA = "bench"
+ID_PREFIX = "bench-search-"
+BATCH_SIZE = 1_000
+
+WORDS = (
+    "rust python postgres kernel compiler database startup security browser linux "
+    "network cache latency memory garbage collector index query planner vector "
+    "model training inference gpu cluster storage replication consensus protocol "
+    "encryption privacy open source license funding hiring remote layoffs market"
+).split()
+QUERIES = ["rust", "postgres index", "gpu inference", '"garbage collector"', "security -browser", "nonexistentterm"]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def article(rng: random.Random, i: int, now: datetime.datetime) -> NewsItem:
+    return NewsItem(
+        id=f"{ID_PREFIX}{i}",
+        title=sentence(rng, 8),
+        date=now - datetime.timedelta(minutes=i),
+        labels=[rng.choice(WORDS)],
+        thumbnail="",
+        description=sentence(rng, 25),
+        cover_image="",
+        summary=sentence(rng, 60),
+        sources=[],
+        content=sentence(rng, 400),
+    )
+
+
+async def seed(repository: NewsRepository, articles: int) -> None:
+    rng = random.Random(0)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = time.perf_counter()
+    for offset in range(0, articles, BATCH_SIZE):
+        await repository.upsert_many(
+            [article(rng, i, now) for i in range(offset, min(offset + BATCH_SIZE, articles))]
+        )
+    print(f"seeded {articles} articles in {time.perf_counter() - start:.1f}s")
+
+
+async def bench(repository: NewsRepository, page_size: int, pages: int, number: int) -> None:
+    print(f"\n{'query':>20} {'page':>5} {'hits':>5} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for query in QUERIES:
+        after: SearchKey | None = None
+        for page in range(1, pages + 1):
+            timings = []
+            for _ in range(number):
+                start = time.perf_counter()
+                hits = await repository.search(query, limit=page_size + 1, after=after)
+                timings.append((time.perf_counter() - start) * 1e3)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(f"{query:>20} {page:>5} {len(hits):>5} {statistics.median(timings):>9.2f} {p95:>9.2f}")
+            if len(hits) <= page_size:
+                break
+            after = (hits[page_size - 1].rank, hits[page_size - 1].id)
+
+
+async def cleanup(db: Database, schema: str) -> None:
+    async with db.aget_session(None) as session:
+        for table in (NewsRepository.ARTICLE_TABLE_NAME, NewsRepository.TABLE_NAME):
+            await session.execute(
+                SQL("DELETE FROM {0} WHERE id LIKE %s").format(Identifier(schema, table)), (f"{ID_PREFIX}%",)
+            )
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> None:
+    schema = os.environ.get("DB_SCHEMA", SCHEMA)
+    db = Database(os.environ["DB_URL"])
+    await db.aopen()
+    try:
+        await MigrationRunner(db, schema).apply()
+        repository = NewsRepository(db, schema)
+        if args.articles:
+            await seed(repository, args.articles)
+            async with db.aget_session(None) as session:
+                await session.execute(
+                    SQL("ANALYZE {0}").format(Identifier(schema, NewsRepository.ARTICLE_TABLE_NAME))
+                )
+                await session.commit()
+        await bench(repository, args.page_size, args.pages, args.number)
+        if not args.keep:
+            await cleanup(db, schema)
+    finally:
+        await db.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measure requests and time to load a story's comment tree, Algolia vs Firebase.
+
+    python scripts/benchmarks/bench_story_tree.py --sizes 50 200 800
+
+Runs against the local stub server. Each size also checks that both paths map
+to the same comments, and that an incomplete Algolia answer falls back to the
+Firebase walk.
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from hn_loader import HNClient, fetch_comment_tree  # noqa: E402
+from stub_hn_server import STORY_ID, StubHNServer, build_story_tree  # noqa: E402
+
+
+async def run(sizes: List[int], latency: float) -> None:
+    print(f"{'comments':>10} {'firebase req':>13} {'firebase (s)':>13} {'algolia req':>12} {'algolia (s)':>12}")
+    for size in sizes:
+        items = build_story_tree(size)
+        with StubHNServer(items, latency=latency) as server:
+            client = HNClient(base_url=server.base_url, algolia_url=server.algolia_url)
+            story = await client.get_story(STORY_ID)
+            assert story is not None
+
+            client.request_count = 0
+            start = time.perf_counter()
+            firebase_comments = await fetch_comment_tree(client, story.kids, max_nodes=None)
+            firebase_time = time.perf_counter() - start
+            firebase_requests = client.request_count
+
+            client.request_count = 0
+            start = time.perf_counter()
+            tree_story, algolia_comments = await client.get_story_tree(STORY_ID, story)
+            algolia_time = time.perf_counter() - start
+            algolia_requests = client.request_count
+
+            assert tree_story.kids == story.kids
+            assert {
+                i: (c.text, c.kids, c.parent) for i, c in firebase_comments.items()
+            } == {i: (c.text, c.kids, c.parent) for i, c in algolia_comments.items()}
+
+            # a stale algolia index has to fall back to firebase
+            client.request_count = 0
+            stale_story = story.model_copy(update={"descendants": size * 2})
+            _, fallback_comments = await client.get_story_tree(STORY_ID, stale_story)
+            assert len(fallback_comments) == len(firebase_comments)
+            assert client.request_count == 1 + firebase_requests
+
+            await client.close()
+
+        print(
+            f"{size:>10} {firebase_requests:>13} {firebase_time:>13.2f} "
+            f"{algolia_requests:>12} {algolia_time:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.latency))
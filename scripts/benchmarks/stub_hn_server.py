@@ -0,0 +1,163 @@
+"""
+Minimal local stand-in for the Hacker News Firebase API, used by the benchmarks
+and the HNClient tests.
+
+It serves a synthetic story with a comment tree of the requested size and adds a
+fixed delay to every response so round trips cost roughly what they cost against
+the real API.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+STORY_ID = 1
+
+
+def build_story_tree(size: int, max_replies: int = 6, seed: int = 42) -> Dict[int, Dict[str, Any]]:
+    """
+    Build a story with `size` comments attached at random places of the tree.
+    """
+    rnd = random.Random(seed)
+    now = int(time.time())
+    items: Dict[int, Dict[str, Any]] = {
+        STORY_ID: {
+            "id": STORY_ID,
+            "type": "story",
+            "by": "stub",
+            "time": now,
+            "title": "Stub story",
+            "url": None,
+            "descendants": size,
+            "kids": [],
+        }
+    }
+    parents: List[int] = [STORY_ID]
+    for comment_id in range(STORY_ID + 1, STORY_ID + 1 + size):
+        parent = rnd.choice(parents)
+        items[parent]["kids"].append(comment_id)
+        items[comment_id] = {
+            "id": comment_id,
+            "type": "comment",
+            "by": f"user{comment_id % 97}",
+            "time": now - rnd.randint(0, 3600),
+            "parent": parent,
+            "text": f"comment {comment_id} " + "lorem ipsum " * rnd.randint(1, 30),
+            "kids": [],
+        }
+        if len(items[parent]["kids"]) >= max_replies and parent != STORY_ID:
+            parents.remove(parent)
+        parents.append(comment_id)
+    return items
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class StubHNServer:
+    """
+    Threaded HTTP server exposing `/v0/item/<id>.json`, `/v0/topstories.json` and
+    Algolia's `/api/v1/items/<id>` for a synthetic tree.
+
+    `request_count` holds the number of requests served since start. Items
+    flagged `deleted` lose their author and text on Algolia like on HN, `dead`
+    ones are left out of Algolia's tree, and setting `algolia_status` makes the
+    Algolia endpoint answer with that error status.
+    """
+
+    _ITEM_PATH = re.compile(r"^/v0/item/(\d+)\.json$")
+    _ALGOLIA_ITEM_PATH = re.compile(r"^/api/v1/items/(\d+)$")
+
+    def __init__(self, items: Dict[int, Dict[str, Any]], latency: float = 0.02) -> None:
+        self.items = items
+        self.latency = latency
+        self.request_count = 0
+        self.algolia_status = 200
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def root_url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.root_url}/v0"
+
+    @property
+    def algolia_url(self) -> str:
+        return f"{self.root_url}/api/v1"
+
+    def algolia_item(self, id: int) -> Optional[Dict[str, Any]]:
+        """
+        The item and its descendants shaped like Algolia's `/items/<id>` answer.
+        """
+        item = self.items.get(id)
+        if item is None or item.get("dead"):
+            return None
+        children = [self.algolia_item(kid) for kid in item.get("kids", [])]
+        return {
+            "id": item["id"],
+            "type": item["type"],
+            "author": None if item.get("deleted") else item.get("by"),
+            "created_at_i": item.get("time"),
+            "parent_id": item.get("parent"),
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "text": None if item.get("deleted") else item.get("text"),
+            "children": [child for child in children if child is not None],
+        }
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:  # noqa: N802
+                with stub._lock:
+                    stub.request_count += 1
+                time.sleep(stub.latency)
+                match = stub._ITEM_PATH.match(self.path)
+                algolia_match = stub._ALGOLIA_ITEM_PATH.match(self.path)
+                status = 200
+                if self.path == "/v0/topstories.json":
+                    payload = [i for i, item in stub.items.items() if item["type"] == "story"]
+                elif algolia_match and stub.algolia_status != 200:
+                    status = stub.algolia_status
+                    payload = {"error": "stub failure"}
+                elif algolia_match:
+                    payload = stub.algolia_item(int(algolia_match.group(1)))
+                else:
+                    payload = stub.items.get(int(match.group(1))) if match else None
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        return Handler
+
+    def __enter__(self) -> "StubHNServer":
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,175 @@
+"""
+Readability style main-content extraction.
+
+Paragraph-like nodes give their text length to their parent and half of it to
+their grandparent; candidates are then weighted by class/id hints and penalised
+by link density, and the best one is taken as the article body. Pages are
+parsed with lxml, several times faster than the pure Python `html.parser`.
+"""
+import dataclasses
+import math
+import re
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+PARSER = "lxml"
+
+UNLIKELY_TAGS = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "form", "button", "input", "select", "nav", "footer", "aside", "header",
+]
+PARAGRAPH_TAGS = ["p", "pre", "blockquote", "li", "td", "h2", "h3"]
+CANDIDATE_TAGS = {"article", "main", "section", "div", "td", "body"}
+
+POSITIVE_HINTS = re.compile(
+    r"article|body|content|entry|main|page|post|text|blog|story", re.I
+)
+NEGATIVE_HINTS = re.compile(
+    r"comment|footer|footnote|sidebar|nav|menu|masthead|share|social|promo|"
+    r"related|banner|cookie|subscribe|newsletter|popup|widget|\bads?\b", re.I
+)
+
+
+@dataclasses.dataclass
+class Extraction:
+    text: str
+    confidence: float
+    paragraphs: int
+    link_density: float
+
+
+def _text_length(node: Tag) -> int:
+    return len(node.get_text(" ", strip=True))
+
+
+def _link_density(node: Tag) -> float:
+    text_length = _text_length(node)
+    if text_length == 0:
+        return 1.0
+    link_length = sum(_text_length(a) for a in node.find_all("a"))
+    return min(link_length / text_length, 1.0)
+
+
+def _class_weight(node: Tag) -> float:
+    hints = " ".join(node.get("class") or []) + " " + (node.get("id") or "")
+    weight = 0.0
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    return weight
+
+
+def _is_boilerplate(node: Tag) -> bool:
+    # whole class tokens only, a substring would also drop wrappers like "has-sidebar"
+    return any(NEGATIVE_HINTS.fullmatch(token) for token in node.get("class") or [])
+
+
+class ContentExtractor:
+    """
+    Extract the main text of an HTML page, reporting how confident the pick is.
+
+    `min_text_length` is the body size (in characters) under which confidence
+    drops, a content-heavy page scores close to 1.
+    """
+
+    def __init__(self, min_text_length: int = 500, parser: str = PARSER):
+        self.min_text_length = min_text_length
+        self.parser = parser
+
+    def extract(self, html: str) -> Extraction:
+        soup = BeautifulSoup(html, self.parser)
+        for node in soup.find_all(UNLIKELY_TAGS):
+            node.decompose()
+        for node in soup.find_all(class_=True):
+            if node.decomposed or node.name in ("body", "html", "article", "main"):
+                continue
+            if _is_boilerplate(node):
+                node.decompose()
+
+        scores: Dict[int, float] = {}
+        nodes: Dict[int, Tag] = {}
+        for paragraph in soup.find_all(PARAGRAPH_TAGS):
+            text_length = _text_length(paragraph)
+            if text_length < 25:
+                continue
+            # commas are a cheap hint of prose as opposed to menus and captions
+            score = 1 + paragraph.get_text().count(",") + min(text_length / 100, 3)
+            for level, ancestor in enumerate(paragraph.parents):
+                if level > 1 or ancestor.name not in CANDIDATE_TAGS:
+                    break
+                key = id(ancestor)
+                if key not in nodes:
+                    nodes[key] = ancestor
+                    scores[key] = _class_weight(ancestor)
+                scores[key] += score if level == 0 else score / 2
+
+        if not scores:
+            body = soup.body or soup
+            return Extraction(
+                text=body.get_text("\n", strip=True),
+                confidence=0.0,
+                paragraphs=0,
+                link_density=_link_density(body),
+            )
+
+        ranked = sorted(
+            ((score * (1 - _link_density(nodes[key])), key) for key, score in scores.items()),
+            reverse=True,
+        )
+        best = nodes[ranked[0][1]]
+        paragraphs: List[str] = [
+            p.get_text(" ", strip=True)
+            for p in best.find_all(PARAGRAPH_TAGS)
+            if not p.find_parent(PARAGRAPH_TAGS)
+        ]
+        paragraphs = [p for p in paragraphs if p]
+        text = "\n".join(paragraphs) if paragraphs else best.get_text("\n", strip=True)
+        return Extraction(
+            text=text,
+            confidence=self._confidence(best, text, len(paragraphs), ranked),
+            paragraphs=len(paragraphs),
+            link_density=_link_density(best),
+        )
+
+    def _confidence(
+        self, best: Tag, text: str, paragraphs: int, ranked: List[tuple]
+    ) -> float:
+        length_factor = min(len(text) / self.min_text_length, 1.0)
+        paragraph_factor = min(paragraphs / 3, 1.0)
+        link_factor = 1 - _link_density(best)
+        # a clear winner is more trustworthy than two close candidates
+        margin = 1.0
+        if len(ranked) > 1 and ranked[0][0] > 0:
+            margin = 0.5 + 0.5 * min(1.0, (ranked[0][0] - ranked[1][0]) / ranked[0][0] * 2)
+        return round(length_factor * paragraph_factor * link_factor * math.sqrt(margin), 3)
+
+
+def truncate_paragraphs(text: str, encoder, max_tokens: int) -> str:
+    """
+    Keep whole paragraphs of `text` while they fit in `max_tokens`.
+
+    A first paragraph which alone is over the budget, a minified or single
+    paragraph page, is cut at a token boundary instead.
+    """
+    kept: List[str] = []
+    used = 0
+    for paragraph in text.split("\n"):
+        tokens = encoder.encode(paragraph)
+        if used + len(tokens) + 1 > max_tokens:
+            if not kept:
+                kept.append(encoder.decode(tokens[: max(max_tokens - 1, 0)]))
+            break
+        kept.append(paragraph)
+        used += len(tokens) + 1
+    return "\n".join(kept)
+
+
+def body_text(html: str, parser: Optional[str] = None) -> str:
+    """
+    The whole <body> text, what was handed to the LLM before local extraction.
+    """
+    website = BeautifulSoup(html, parser or "html.parser")
+    website_body = website.find("body") or website
+    return website_body.get_text(separator="\n", strip=True)
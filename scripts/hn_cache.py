@@ -0,0 +1,206 @@
+"""
+Persistent on-disk cache for raw Hacker News items.
+
+Items are stored in SQLite keyed by item id. How long a cached item stays fresh
+depends on its type and on how old the item is: fresh posts keep gaining
+replies and points, while anything older than `immutable_after` seconds can no
+longer change and is served from disk forever.
+"""
+import dataclasses
+import json
+import pathlib
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# (max item age, ttl) brackets per item type, both in seconds
+DEFAULT_TTLS: Dict[str, List[Tuple[int, int]]] = {
+    "story": [(HOUR, 60), (6 * HOUR, 5 * 60), (DAY, 30 * 60), (14 * DAY, 6 * HOUR)],
+    "comment": [(HOUR, 5 * 60), (6 * HOUR, 15 * 60), (DAY, HOUR), (14 * DAY, 12 * HOUR)],
+    "default": [(HOUR, 5 * 60), (DAY, HOUR), (14 * DAY, 12 * HOUR)],
+}
+
+# HN locks threads after two weeks, past that point items never change
+IMMUTABLE_AFTER = 14 * DAY
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"hits={self.hits} misses={self.misses} (stale={self.stale}) "
+            f"hit_rate={self.hit_rate:.1%} evictions={self.evictions}"
+        )
+
+
+class ItemCache:
+    """
+    SQLite backed item cache with per type/age freshness and size based LRU eviction.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, pathlib.Path],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[Dict[str, List[Tuple[int, int]]]] = None,
+        immutable_after: int = IMMUTABLE_AFTER,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = ttls or DEFAULT_TTLS
+        self.immutable_after = immutable_after
+        self.stats = CacheStats()
+
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                type TEXT,
+                item_time INTEGER,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_accessed_at ON items (accessed_at)")
+        # running total of the item sizes, kept by triggers so writes never scan the table
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+        )
+        self._db.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS items_size_insert AFTER INSERT ON items BEGIN
+                UPDATE cache_size SET total = total + NEW.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS items_size_update AFTER UPDATE OF size ON items BEGIN
+                UPDATE cache_size SET total = total - OLD.size + NEW.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS items_size_delete AFTER DELETE ON items BEGIN
+                UPDATE cache_size SET total = total - OLD.size WHERE id = 0;
+            END;
+            """
+        )
+        if self._db.execute("SELECT total FROM cache_size WHERE id = 0").fetchone() is None:
+            # first open, or a cache created before the total was tracked
+            self._db.execute("INSERT INTO cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM items")
+        self._db.commit()
+
+    def ttl_for(self, item_type: Optional[str], item_time: Optional[int], now: float) -> Optional[float]:
+        """
+        Seconds a cached item stays fresh, `None` meaning it never expires.
+        """
+        if item_time is None:
+            return self.ttls["default"][0][1]
+        age = now - item_time
+        if age >= self.immutable_after:
+            return None
+        for max_age, ttl in self.ttls.get(item_type or "default", self.ttls["default"]):
+            if age < max_age:
+                return ttl
+        return self.ttls["default"][-1][1]
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up a batch of ids, returning the raw item of every fresh hit.
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        now = time.time()
+        found: Dict[int, Dict[str, Any]] = {}
+        # keep well below SQLITE_MAX_VARIABLE_NUMBER
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            rows = self._db.execute(
+                f"SELECT id, type, item_time, fetched_at, data FROM items "
+                f"WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for item_id, item_type, item_time, fetched_at, data in rows:
+                ttl = self.ttl_for(item_type, item_time, now)
+                if ttl is not None and now - fetched_at > ttl:
+                    self.stats.stale += 1
+                    continue
+                found[item_id] = json.loads(data)
+
+        if found:
+            self._db.executemany(
+                "UPDATE items SET accessed_at = ? WHERE id = ?",
+                [(now, item_id) for item_id in found],
+            )
+            self._db.commit()
+        self.stats.hits += len(found)
+        self.stats.misses += len(ids) - len(found)
+        return found
+
+    def get(self, id: int) -> Optional[Dict[str, Any]]:
+        return self.get_many([id]).get(id)
+
+    def put_many(self, items: Iterable[Dict[str, Any]]) -> None:
+        now = time.time()
+        rows = []
+        for item in items:
+            data = json.dumps(item, separators=(",", ":"))
+            rows.append((item["id"], item.get("type"), item.get("time"), now, now, len(data), data))
+        if not rows:
+            return
+        # an upsert rather than INSERT OR REPLACE, replaced rows do not fire the delete trigger
+        self._db.executemany(
+            "INSERT INTO items (id, type, item_time, fetched_at, accessed_at, size, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET type = excluded.type, item_time = excluded.item_time, "
+            "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at, "
+            "size = excluded.size, data = excluded.data",
+            rows,
+        )
+        self._db.commit()
+        self._evict()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self.put_many([item])
+
+    def size(self) -> int:
+        return self._db.execute("SELECT total FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used items until the cache is back under 90% of `max_bytes`.
+        """
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cursor = self._db.execute("SELECT id, size FROM items ORDER BY accessed_at")
+        evicted: List[int] = []
+        for item_id, size in cursor:
+            if total <= target:
+                break
+            evicted.append(item_id)
+            total -= size
+        self._db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i in evicted])
+        self._db.commit()
+        self.stats.evictions += len(evicted)
+
+    def close(self) -> None:
+        self._db.close()
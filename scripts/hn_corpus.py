@@ -0,0 +1,164 @@
+"""
+Token budgeted rendering of HN comment threads for the article prompt.
+
+Comments are picked best-first: a reply can only be kept once its parent was
+kept, and among the candidates the ones heading big, shallow and recent
+subtrees go first. Selection stops at comment boundaries as soon as the next
+comment does not fit the budget, and the kept comments are rendered in the
+original thread order with a single join.
+"""
+import dataclasses
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+COMMENT_OPEN = '<comment>\n<content>\n'
+COMMENT_CLOSE = '</content>\n'
+COMMENT_END = '</comment>'
+
+
+@dataclasses.dataclass
+class CorpusStats:
+    budget: int
+    thread_tokens: int = 0
+    used_tokens: int = 0
+    kept_comments: int = 0
+    dropped_comments: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.thread_tokens - self.used_tokens
+
+    def __str__(self) -> str:
+        return (
+            f"{self.used_tokens}/{self.budget} tokens used, {self.kept_comments} comments kept, "
+            f"{self.dropped_comments} dropped, {self.saved_tokens} prompt tokens saved"
+        )
+
+
+class CorpusBuilder:
+    """
+    Render comment trees within a token budget using `encoder` (a tiktoken encoding).
+
+    `depth_weight`, `replies_weight` and `recency_weight` tune how subtrees are ranked.
+    """
+
+    def __init__(
+        self,
+        encoder: Any,
+        depth_weight: float = 1.0,
+        replies_weight: float = 1.0,
+        recency_weight: float = 0.5,
+    ):
+        self.encoder = encoder
+        self.depth_weight = depth_weight
+        self.replies_weight = replies_weight
+        self.recency_weight = recency_weight
+        # tag overhead of one comment, with the newline separating it from its siblings
+        self._comment_overhead = self.count(COMMENT_OPEN + COMMENT_CLOSE + COMMENT_END + '\n')
+
+    def count(self, text: str) -> int:
+        return len(self.encoder.encode(text))
+
+    def _subtree_sizes(self, comments: Dict[int, Any], root_ids: Iterable[int]) -> Dict[int, int]:
+        sizes: Dict[int, int] = {}
+        # iterative post-order, threads can be deep
+        stack: List[Tuple[int, bool]] = [(i, False) for i in root_ids if i in comments]
+        while stack:
+            comment_id, expanded = stack.pop()
+            kids = [k for k in comments[comment_id].kids if k in comments]
+            if expanded:
+                sizes[comment_id] = 1 + sum(sizes[k] for k in kids)
+            else:
+                stack.append((comment_id, True))
+                stack.extend((k, False) for k in kids)
+        return sizes
+
+    def select(
+        self, comments: Dict[int, Any], root_ids: List[int], budget: int
+    ) -> Tuple[Set[int], CorpusStats]:
+        """
+        Pick the comments to keep so their rendering stays within `budget` tokens.
+        """
+        stats = CorpusStats(budget=budget)
+        sizes = self._subtree_sizes(comments, root_ids)
+        times = [c.time for c in comments.values() if c.time is not None]
+        oldest, newest = (min(times), max(times)) if times else (0, 0)
+        span = max(newest - oldest, 1)
+
+        tokens = {
+            comment_id: self._comment_overhead + self.count(comment.text or 'no content')
+            for comment_id, comment in comments.items()
+        }
+        stats.thread_tokens = sum(tokens[i] for i in sizes)
+
+        def priority(comment_id: int, depth: int) -> float:
+            comment = comments[comment_id]
+            recency = ((comment.time or oldest) - oldest) / span
+            return (
+                self.replies_weight * math.log1p(sizes[comment_id])
+                - self.depth_weight * depth
+                + self.recency_weight * recency
+            )
+
+        keep: Set[int] = set()
+        candidates: List[Tuple[float, int, int, int]] = []
+        for order, comment_id in enumerate(i for i in root_ids if i in sizes):
+            heapq.heappush(candidates, (-priority(comment_id, 0), order, comment_id, 0))
+        order = len(candidates)
+
+        while candidates:
+            _, _, comment_id, depth = heapq.heappop(candidates)
+            if comment_id in keep:
+                continue
+            if stats.used_tokens + tokens[comment_id] > budget:
+                # a smaller sibling elsewhere may still fit
+                continue
+            keep.add(comment_id)
+            stats.used_tokens += tokens[comment_id]
+            for kid in comments[comment_id].kids:
+                if kid in sizes:
+                    order += 1
+                    heapq.heappush(candidates, (-priority(kid, depth + 1), order, kid, depth + 1))
+
+        stats.kept_comments = len(keep)
+        stats.dropped_comments = len(sizes) - len(keep)
+        return keep, stats
+
+    def render(
+        self,
+        comments: Dict[int, Any],
+        root_ids: List[int],
+        keep: Optional[Set[int]] = None,
+    ) -> str:
+        """
+        Render `root_ids` and their replies as nested <comment> tags, one root per line.
+        """
+        parts: List[str] = []
+        for comment_id in root_ids:
+            if comment_id in comments and (keep is None or comment_id in keep):
+                self._render_into(parts, comments, comment_id, keep)
+                parts.append('\n')
+        return ''.join(parts)
+
+    def _render_into(
+        self,
+        parts: List[str],
+        comments: Dict[int, Any],
+        comment_id: int,
+        keep: Optional[Set[int]],
+    ) -> None:
+        parts.append(COMMENT_OPEN)
+        parts.append(comments[comment_id].text or 'no content')
+        parts.append(COMMENT_CLOSE)
+        for kid in comments[comment_id].kids:
+            if kid in comments and (keep is None or kid in keep):
+                self._render_into(parts, comments, kid, keep)
+                parts.append('\n')
+        parts.append(COMMENT_END)
+
+    def build(
+        self, comments: Dict[int, Any], root_ids: List[int], budget: int
+    ) -> Tuple[str, CorpusStats]:
+        keep, stats = self.select(comments, root_ids, budget)
+        return self.render(comments, root_ids, keep), stats
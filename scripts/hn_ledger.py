@@ -0,0 +1,121 @@
+"""
+Ledger of the stories the loader already processed.
+
+Every judged story is recorded with its filter verdict, when its article was
+generated and how many comments it had at the time, so later runs only spend
+LLM and HTTP calls on stories which are new or whose discussion grew a lot.
+"""
+import dataclasses
+import json
+import pathlib
+import time
+from typing import Dict, Optional, Union
+
+from result_writer import write_json_atomic
+
+DAY = 24 * 60 * 60
+
+
+@dataclasses.dataclass
+class LedgerEntry:
+    story_id: int
+    accepted: bool
+    processed_at: float
+    comment_count: int
+    article_generated_at: Optional[float] = None
+    title: Optional[str] = None
+    url: Optional[str] = None
+    # "llm" or "prefilter", only LLM verdicts are used to train the prefilter
+    judged_by: str = "llm"
+
+
+class StoryLedger:
+    """
+    JSON file backed ledger of processed stories.
+
+    A story is processed again once its comment count grew by at least
+    `min_comment_growth` comments and by `comment_growth_ratio` relative to the
+    count it had when it was last processed. Entries older than `retention`
+    seconds are dropped when the ledger is saved.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, pathlib.Path],
+        comment_growth_ratio: float = 0.5,
+        min_comment_growth: int = 20,
+        retention: int = 30 * DAY,
+    ):
+        self.path = pathlib.Path(path)
+        self.comment_growth_ratio = comment_growth_ratio
+        self.min_comment_growth = min_comment_growth
+        self.retention = retention
+        self.entries: Dict[int, LedgerEntry] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.entries = {
+                    int(story_id): LedgerEntry(**entry)
+                    for story_id, entry in json.load(f).items()
+                }
+
+    @staticmethod
+    def comment_count(story) -> int:
+        return story.descendants if story.descendants is not None else len(story.kids)
+
+    def get(self, story_id: int) -> Optional[LedgerEntry]:
+        return self.entries.get(story_id)
+
+    def has_grown(self, story) -> bool:
+        entry = self.entries[story.id]
+        growth = self.comment_count(story) - entry.comment_count
+        return (
+            growth >= self.min_comment_growth
+            and growth >= entry.comment_count * self.comment_growth_ratio
+        )
+
+    def needs_processing(self, story, has_article: bool = True) -> bool:
+        """
+        Whether `story` has to go through the pipeline again.
+
+        `has_article` tells if the article of a previously accepted story is
+        still available, otherwise it has to be generated again.
+        """
+        entry = self.entries.get(story.id)
+        if entry is None:
+            return True
+        if entry.accepted and not has_article:
+            return True
+        return self.has_grown(story)
+
+    def record(
+        self,
+        story,
+        accepted: bool,
+        article_generated: bool = False,
+        judged_by: str = "llm",
+    ) -> LedgerEntry:
+        now = time.time()
+        entry = LedgerEntry(
+            story_id=story.id,
+            accepted=accepted,
+            processed_at=now,
+            comment_count=self.comment_count(story),
+            article_generated_at=now if article_generated else None,
+            title=story.title,
+            url=story.url,
+            judged_by=judged_by,
+        )
+        self.entries[story.id] = entry
+        return entry
+
+    def save(self) -> None:
+        cutoff = time.time() - self.retention
+        self.entries = {
+            story_id: entry
+            for story_id, entry in self.entries.items()
+            if entry.processed_at >= cutoff
+        }
+        # a crash never leaves a torn ledger
+        write_json_atomic(
+            self.path, {str(k): dataclasses.asdict(v) for k, v in self.entries.items()}
+        )
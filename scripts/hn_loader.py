@@ -1,7 +1,10 @@
 import asyncio
+import dataclasses
 import datetime
+import pathlib
 import re
-from typing import List, Optional, Union, Literal
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union, Literal
 
 import httpx
 from pydantic import BaseModel, Field
@@ -9,6 +12,18 @@ import tiktoken
 
 import pydantic
 
+from content_extractor import PARSER, ContentExtractor, body_text, truncate_paragraphs
+from hn_cache import ItemCache
+from hn_corpus import CorpusBuilder
+from hn_ledger import StoryLedger
+from hn_pipeline import Pipeline, Stage
+from hn_prefilter import FilterStats, PreFilter
+from image_store import ImageStore, StoredImage
+from llm_cache import CacheMode, ResponseCache
+from llm_gateway import LLMGateway
+from page_fetcher import PageFetcher, PageFetchError
+from result_writer import CheckpointStore, ResultWriter, write_json_atomic
+
 
 def to_lower_camel_case(snake_str: str) -> str:
     # We capitalize the first letter of each component except the first one
@@ -111,15 +126,19 @@ class HNClient:
         self,
         base_url: str = "https://hacker-news.firebaseio.com/v0",
         algolia_url: str = "https://hn.algolia.com/api/v1",
+        cache: Optional[ItemCache] = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.algolia_url = algolia_url.rstrip("/")
-        self.client = httpx.AsyncClient()
+        self.request_count = 0
+        self.client = httpx.AsyncClient(event_hooks={"request": [self._count_request]})
+        self.cache = cache
 
-    async def get_item(self, id: int) -> Union[Story, Comment, Job, Poll, PollOpt, Item]:
-        resp = await self.client.get(f"{self.base_url}/item/{id}.json")
-        resp.raise_for_status()
-        data = resp.json() or {}
+    async def _count_request(self, request: httpx.Request) -> None:
+        self.request_count += 1
+
+    @staticmethod
+    def _parse_item(data: dict) -> Union[Story, Comment, Job, Poll, PollOpt, Item]:
         t = data.get("type")
         mapping = {
             "story": Story,
@@ -131,6 +150,38 @@ class HNClient:
         model = mapping.get(t, Item)
         return model(**data)
 
+    async def _fetch_item(self, id: int) -> dict:
+        resp = await self.client.get(f"{self.base_url}/item/{id}.json")
+        resp.raise_for_status()
+        return resp.json() or {}
+
+    async def get_item(self, id: int) -> Union[Story, Comment, Job, Poll, PollOpt, Item]:
+        return (await self.get_items([id]))[0]
+
+    async def get_items(
+        self, ids: List[int], max_in_flight: int = 16
+    ) -> List[Union[Story, Comment, Job, Poll, PollOpt, Item]]:
+        """
+        Fetch a batch of items, in the order of `ids`.
+
+        Fresh items are served from the cache in a single lookup and only the
+        misses go to the API, at most `max_in_flight` at a time.
+        """
+        cached = self.cache.get_many(ids) if self.cache is not None else {}
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def fetch(id: int) -> dict:
+            async with semaphore:
+                return await self._fetch_item(id)
+
+        missing = [i for i in dict.fromkeys(ids) if i not in cached]
+        fetched = dict(zip(missing, await asyncio.gather(*(fetch(i) for i in missing))))
+        if self.cache is not None:
+            # null items (deleted or not yet propagated) are not cached
+            self.cache.put_many(data for data in fetched.values() if data)
+
+        return [self._parse_item(cached.get(i) or fetched[i]) for i in ids]
+
     async def get_story(self, id: int) -> Optional[Story]:
         item = await self.get_item(id)
         if not isinstance(item, Story):
@@ -203,6 +254,71 @@ class HNClient:
                 )
         return results
 
+    @staticmethod
+    def _map_algolia_tree(node: dict, comments: Dict[int, Comment]) -> List[int]:
+        """
+        Flatten the children of an Algolia item into `comments`, returns the ids of the direct children.
+        """
+        kids = []
+        for child in node.get("children") or []:
+            if child.get("type") != "comment" or child.get("id") is None:
+                continue
+            comments[child["id"]] = Comment(
+                id=child["id"],
+                type="comment",
+                by=child.get("author"),
+                time=child.get("created_at_i"),
+                parent=child.get("parent_id"),
+                text=child.get("text"),
+                kids=HNClient._map_algolia_tree(child, comments),
+            )
+            kids.append(child["id"])
+        return kids
+
+    async def get_story_tree(
+        self,
+        id: int,
+        story: Optional[Story] = None,
+        min_completeness: float = 0.9,
+    ) -> Tuple[Story, Dict[int, Comment]]:
+        """
+        Get a story and its whole comment tree from the Algolia items endpoint in one request.
+
+        The Firebase story (fetched unless `story` is given) stays the source of
+        truth: its top level order is kept, and if Algolia fails or returns less
+        than `min_completeness` of the story's comments the tree is fetched from
+        Firebase instead.
+        """
+        if story is None:
+            story = await self.get_story(id)
+            if story is None:
+                raise TypeError(f"Item {id} is not a story")
+
+        try:
+            resp = await self.client.get(f"{self.algolia_url}/items/{id}")
+            resp.raise_for_status()
+            comments: Dict[int, Comment] = {}
+            algolia_kids = self._map_algolia_tree(resp.json(), comments)
+        except (httpx.HTTPError, ValueError, pydantic.ValidationError) as e:
+            print(f'algolia tree for story {id} failed, falling back to firebase => {e!r}')
+            return story, await fetch_comment_tree(self, story.kids)
+
+        expected = story.descendants if story.descendants is not None else len(story.kids)
+        # deleted comments come back from algolia without text and are not part of descendants
+        found = sum(1 for comment in comments.values() if comment.text is not None)
+        if found < expected * min_completeness:
+            print(
+                f'algolia tree for story {id} is incomplete ({found}/{expected}), '
+                f'falling back to firebase'
+            )
+            return story, await fetch_comment_tree(self, story.kids)
+
+        # keep the HN ranking of the top level comments, then whatever algolia adds
+        ranked = [kid for kid in story.kids if kid in comments]
+        seen = set(ranked)
+        ranked += [kid for kid in algolia_kids if kid not in seen]
+        return story.model_copy(update={"kids": ranked}), comments
+
     async def get_latest_stories(self, limit: int = 30) -> List[Story]:
         resp = await self.client.get(f"{self.base_url}/newstories.json")
         resp.raise_for_status()
@@ -229,7 +345,6 @@ import json
 from dotenv import load_dotenv
 import httpx
 import openai
-from bs4 import BeautifulSoup
 
 # Load environment variables
 load_dotenv()
@@ -238,77 +353,108 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 encoder = tiktoken.encoding_for_model('gpt-4o-mini')
 
 MAX_TOKENS = 120000
+ARTICLE_MAX_TOKENS = 600
+# source page text kept in the article prompt
+SOURCE_MAX_TOKENS = 4000
+# below this the page content is extracted by the LLM instead
+EXTRACTION_MIN_CONFIDENCE = 0.5
+# stories judged per LLM call
+FILTER_BATCH_SIZE = 8
+# completion budget per verdict, a tagged answer for an 8 digit id takes about 15 tokens
+FILTER_ANSWER_MAX_TOKENS = 40
+
+corpus_builder = CorpusBuilder(encoder)
+content_extractor = ContentExtractor()
+
+CACHE_DIR = pathlib.Path(
+    os.getenv("HN_LOADER_CACHE_DIR", pathlib.Path(__file__).parent.parent.joinpath(".cache", "hn_loader"))
+)
+# set HN_ITEM_CACHE=0 to always hit the HN API
+USE_ITEM_CACHE = os.getenv("HN_ITEM_CACHE", "1") != "0"
+# LLM_CACHE=refresh ignores cached responses but stores new ones, LLM_CACHE=bypass disables the cache
+LLM_CACHE_MODE = CacheMode.from_str(os.getenv("LLM_CACHE"))
+
+# every OpenAI call goes through this gateway, limits match the account tier
+llm = LLMGateway(
+    encoder=encoder,
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", 8)),
+    requests_per_minute=int(os.getenv("OPENAI_RPM", 500)),
+    tokens_per_minute=int(os.getenv("OPENAI_TPM", 200_000)),
+    images_per_minute=int(os.getenv("OPENAI_IMAGES_PER_MINUTE", 5)),
+    cache=ResponseCache(CACHE_DIR.joinpath("llm"), mode=LLM_CACHE_MODE),
+)
 
 async def extract_main_url_content(content: str) -> str:
 
-    website = BeautifulSoup(content, 'html.parser')
-    
-    website_body = website.find('body')
+    extraction = content_extractor.extract(content)
+    if extraction.confidence >= EXTRACTION_MIN_CONFIDENCE:
+        return truncate_paragraphs(extraction.text, encoder, SOURCE_MAX_TOKENS)
+
+    # the local extractor is unsure about this page, let the LLM strip the boilerplate
+    print(f'low extraction confidence ({extraction.confidence}), falling back to the LLM')
     prompt = (
         "You are a web scrapping bot for a news company, extract the raw information contain the following html source code.\n" +
         "<raw_source>\n" +
-        website_body.get_text(separator='\n', strip=True) +
+        truncate_paragraphs(body_text(content, PARSER), encoder, MAX_TOKENS - SOURCE_MAX_TOKENS) +
         "</raw_source>"
     )
     
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=800,
-        temperature=0.7
-    )
-    return response.choices[0].message.content.strip()
+    return await llm.chat(prompt, model="gpt-4o-mini", max_tokens=800, temperature=0.7)
 
-async def gather_full_comment_thread(client: HNClient, comment_id: int) -> str:
+COMMENT_FETCH_CONCURRENCY = 16
+MAX_COMMENT_DEPTH: Optional[int] = None
+MAX_COMMENT_NODES: Optional[int] = 2000
 
-    
-    comment = await client.get_comment(comment_id)
-    
-    formatted_result = (
-        '<comment>\n'+
-        '<content>\n' +
-        (comment.text or 'no content') +
-        '</content>\n'
-    )
-    
-    for nested_comment_id in comment.kids:
-        nested_comment  = await gather_full_comment_thread(client, nested_comment_id)
-        formatted_result += nested_comment + '\n'
-    
-    formatted_result += '</comment>'
-    
-    return formatted_result
-    
-    
 
-async def gather_full_story_corpus(client: HNClient, story: Story) -> str:
-    
-    if story.url is not None:
-        async with httpx.AsyncClient() as http_client:
-            story_source = await http_client.get(story.url)
-            story_source.raise_for_status()
-            story_source_text = story_source.text
+async def fetch_comment_tree(
+    client: HNClient,
+    root_ids: List[int],
+    max_in_flight: int = COMMENT_FETCH_CONCURRENCY,
+    max_depth: Optional[int] = MAX_COMMENT_DEPTH,
+    max_nodes: Optional[int] = MAX_COMMENT_NODES,
+) -> Dict[int, Comment]:
+    """
+    Fetch the comment trees hanging from `root_ids` level by level (BFS).
+
+    Every level is looked up in the item cache as one batch and the misses are
+    requested concurrently, with at most `max_in_flight` requests open at once.
+    `max_depth` limits how many levels are walked and `max_nodes` how many
+    comments are fetched overall; when the node cap is hit the earlier levels
+    and the earlier siblings of a level are kept.
+    """
+    comments: Dict[int, Comment] = {}
+
+    level = list(root_ids)
+    depth = 0
+    while level and (max_depth is None or depth < max_depth):
+        if max_nodes is not None:
+            level = level[: max(max_nodes - len(comments), 0)]
+        next_level: List[int] = []
+        for comment in await client.get_items(level, max_in_flight=max_in_flight):
+            if not isinstance(comment, Comment):
+                raise TypeError(f"Item {comment.id} is not a comment")
+            comments[comment.id] = comment
+            next_level.extend(comment.kids)
+        level = next_level
+        depth += 1
+
+    return comments
+
+
+def render_comment_thread(comments: Dict[int, Comment], comment_id: int) -> str:
+    """
+    Render an already fetched comment and its replies as nested <comment> tags,
+    in the same order HN lists them. Replies which were not fetched are skipped.
+    """
+    return corpus_builder.render(comments, [comment_id]).rstrip('\n')
 
-        extracted_source_content = await extract_main_url_content(story_source_text)
 
+async def gather_full_comment_thread(client: HNClient, comment_id: int) -> str:
+    comments = await fetch_comment_tree(client, [comment_id])
+    return render_comment_thread(comments, comment_id)
 
-    conversation_thread = (
-        '<thread_title>\n' +
-        story.title +
-        '<thread_title>\n' +
-        '<thread_description>\n' +
-            (story.text or 'no description') +
-        '</thread_description>\n'
-    )
 
-    for comment_id in story.kids:
-        comment = await gather_full_comment_thread(client, comment_id)
-        conversation_thread += comment + '\n'
-        
-        
-        
-        
-        
+def story_prompt(extracted_source_content: str, conversation_thread: str) -> str:
     return f"""You are a new york times best writers. 
     You are tasked with the duty of creating a good compelling article for our readers based on the following story found in hacker news.
     You'll be given the story source url content in between <story_url_content> tags and the hacker news conversation that followed it in <story_conversation> tags.
@@ -331,72 +477,164 @@ async def gather_full_story_corpus(client: HNClient, story: Story) -> str:
     """
 
 
-def generate_article(prompt: str) -> str:
-    """
-    Summarize a list of comment texts using OpenAI.
-    """
+async def gather_full_story_corpus(
+    client: HNClient, story: Story, page_fetcher: PageFetcher
+) -> str:
     
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=600,
-        temperature=0.7
+    extracted_source_content = 'no url content'
+    if story.url is not None:
+        try:
+            story_source_text = await page_fetcher.fetch(story.url)
+        except (PageFetchError, httpx.HTTPError) as e:
+            # the HN discussion alone is still worth an article
+            print(f'could not fetch the source of story {story.id} => {e!r}')
+            story_source_text = None
+
+        if story_source_text is not None:
+            extracted_source_content = await extract_main_url_content(story_source_text)
+
+
+    thread_header = (
+        '<thread_title>\n' +
+        story.title +
+        '<thread_title>\n' +
+        '<thread_description>\n' +
+            (story.text or 'no description') +
+        '</thread_description>\n'
     )
-    return response.choices[0].message.content.strip()
+
+    # whatever the prompt around the comments does not use, minus the answer, is left for them
+    budget = (
+        MAX_TOKENS
+        - ARTICLE_MAX_TOKENS
+        - corpus_builder.count(story_prompt(extracted_source_content, thread_header))
+    )
+    story, comments = await client.get_story_tree(story.id, story)
+    rendered_comments, stats = corpus_builder.build(comments, story.kids, max(budget, 0))
+    print(f'story {story.id} corpus: {stats}')
+
+    return story_prompt(extracted_source_content, thread_header + rendered_comments)
 
 
-def filter_article(story: Story) -> bool:
+async def generate_article(prompt: str) -> str:
     """
     Summarize a list of comment texts using OpenAI.
     """
+    
+    return await llm.chat(prompt, model="gpt-4o-mini", max_tokens=ARTICLE_MAX_TOKENS, temperature=0.7)
+
 
-    source_material = (
+def story_source_material(story: Story) -> str:
+    return (
         "<title> \n" +
-        story.title or "no title" +
+        (story.title or "no title") +
         "</title> \n" +
         "<url> \n" + 
-        story.url or 'no url' +
+        (story.url or 'no url') +
         "</url> \n" + 
         "<content>\n" +
-        story.text or "no content" +
+        (story.text or "no content") +
         "</content>\n" +
         "<comment_count>\n" +
-        len(story.kids) +
+        str(len(story.kids)) +
         "</comment_count>\n"
     )
+
+
+async def filter_articles(stories: List[Story]) -> Dict[int, bool]:
+    """
+    Judge a batch of stories with a single LLM call, returns the verdict per story id.
+
+    Stories missing from the answer are left out, they stay unjudged.
+    """
+
+    source_materials = "".join(
+        f'<source_material id="{story.id}">\n' +
+        story_source_material(story) +
+        "</source_material>\n"
+        for story in stories
+    )
     prompt = (
-        "Judge if the following source material could be of interest for our readers.\n" +
+        "Judge if each of the following source materials could be of interest for our readers.\n" +
         "You should remember our readers interest are based on the following principles:\n" + 
         "We want new DYI projects which are related to robotics, clever use of software for automation, gaming or electronics which can be replicate by a person.\n" +
         "We like information which could prove helpful to build a new startup.\n" +
         "We like scientific innovation in areas such as biology, mechanics, automobile and electronics. \n" +
         "We don't care about US specific taxes or problems which can't be understood by people living outside USA.\n" +
-        "You answer MUST be tagged with <judge_answer></judge_answer> and it will be evaluated using the literals ['yes', 'no'] python function.\n" +
-        "As an example <judge_answer>Yes</judge_answer>  => False \n" +
-        "As an example <judge_answer>yes</judge_answer>  => True \n" +
-        "As an example <judge_answer>No</judge_answer>  => False \n" +
-        "As an example <judge_answer>probably</judge_answer>  => False \n" +
-        "<source_material>\n" +
-        source_material +
-        "</source_material>\n" 
+        "You MUST answer once per source material, tagging each answer with <judge_answer id=\"...\"></judge_answer> using the id of the source material, and it will be evaluated using the literals ['yes', 'no'] python function.\n" +
+        "As an example <judge_answer id=\"1\">Yes</judge_answer>  => False \n" +
+        "As an example <judge_answer id=\"1\">yes</judge_answer>  => True \n" +
+        "As an example <judge_answer id=\"1\">No</judge_answer>  => False \n" +
+        "As an example <judge_answer id=\"1\">probably</judge_answer>  => False \n" +
+        source_materials
     )
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=20,
-        temperature=0.7
+    answer = await llm.chat(
+        prompt, model="gpt-4o-mini", max_tokens=FILTER_ANSWER_MAX_TOKENS * len(stories), temperature=0.7
     )
-    answer = response.choices[0].message.content.strip()
-    
-    result = re.search(r"<judge_answer>(.*?)</judge_answer>", answer)
 
-    if result:
-        value = result.group(1).strip()
-        return value.lower() == 'yes'
-    return False
+    story_ids = {story.id for story in stories}
+    verdicts: Dict[int, bool] = {}
+    for story_id, value in re.findall(r'<judge_answer id="(\d+)">(.*?)</judge_answer>', answer):
+        if int(story_id) in story_ids:
+            verdicts[int(story_id)] = value.strip().lower() == 'yes'
+    return verdicts
+
 
+async def filter_article(story: Story) -> Optional[bool]:
+    return (await filter_articles([story])).get(story.id)
 
-def generate_lead(article):
+
+async def judge_stories(
+    stories: List[Story], ledger: StoryLedger, prefilter: PreFilter
+) -> Tuple[List[Story], FilterStats]:
+    """
+    Two tier filter: obvious rejects are dropped by the local prefilter, the rest
+    is judged by the LLM in batches of FILTER_BATCH_SIZE stories.
+    """
+    stats = FilterStats(candidates=len(stories))
+    start = time.perf_counter()
+
+    candidates = []
+    for story in stories:
+        if prefilter.is_obvious_reject(story.title, story.url):
+            print(f'skipping story {story.id} due to not being of interest (prefilter)')
+            ledger.record(story, accepted=False, judged_by="prefilter")
+            stats.prefiltered += 1
+        else:
+            candidates.append(story)
+
+    batches = [
+        candidates[i : i + FILTER_BATCH_SIZE]
+        for i in range(0, len(candidates), FILTER_BATCH_SIZE)
+    ]
+    stats.llm_calls = len(batches)
+    verdicts: Dict[int, bool] = {}
+    for result in await asyncio.gather(*(filter_articles(batch) for batch in batches), return_exceptions=True):
+        if isinstance(result, Exception):
+            # unjudged stories are not recorded, the next run judges them again
+            print(f'there was an error while judging stories => {result}')
+            continue
+        verdicts.update(result)
+
+    accepted = []
+    for story in candidates:
+        if story.id not in verdicts:
+            # missing from the answer, judged again by the next run
+            stats.unjudged += 1
+            continue
+        if verdicts[story.id]:
+            accepted.append(story)
+            ledger.record(story, accepted=True)
+        else:
+            print(f'skipping story {story.id} due to not being of interest')
+            ledger.record(story, accepted=False)
+
+    stats.accepted = len(accepted)
+    stats.judging_seconds = time.perf_counter() - start
+    return accepted, stats
+
+
+async def generate_lead(article):
     """
     Summarize a list of comment texts using OpenAI.
     """
@@ -412,26 +650,15 @@ def generate_lead(article):
         article +
         "</Article>\n" 
     )
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=200,
-        temperature=0.7
-    )
-    return response.choices[0].message.content.strip()
-
+    return await llm.chat(prompt, model="gpt-4o-mini", max_tokens=200, temperature=0.7)
 
-def generate_image(article_summary):
-    client = openai.OpenAI()
-    result = client.images.generate(
-    model="gpt-image-1",
-    size='1024x1024',
-    # response_format='b64_json',
-    prompt="Generate a cover image in  8bit style for an article which contains the following summary, the image should not contain any brands or or infringe any IP laws, it should be simply a visually pleasing image for a personal news paper: " + article_summary
-)
 
-    image_base64 = result.data[0].b64_json
-    return image_base64
+async def generate_image(article_summary):
+    return await llm.image(
+        model="gpt-image-1",
+        size='1024x1024',
+        prompt="Generate a cover image in  8bit style for an article which contains the following summary, the image should not contain any brands or or infringe any IP laws, it should be simply a visually pleasing image for a personal news paper: " + article_summary
+    )
 
 from typing import List
 from pydantic import BaseModel, Field
@@ -452,7 +679,9 @@ class NewsItem(CamelCaseDTO):
     title: str
     date: datetime.datetime
     labels: List[str]
+    # paths of the image variants under web/public
     cover_image: str
+    thumbnail: str
     description: str
     summary: str
     sources: List[ArticleSource]
@@ -463,54 +692,228 @@ class NewsItem(CamelCaseDTO):
 
 
 
+RESULT_PATH = pathlib.Path(__file__).parent.parent.joinpath('web', 'src', 'result.json')
+
+
+# state of the run in progress, kept until the feed is written
+RUN_PATH = CACHE_DIR.joinpath('run')
+COVERS_PATH = pathlib.Path(__file__).parent.parent.joinpath('web', 'public', 'covers')
+
+
+def load_published_news(path: pathlib.Path, image_store: ImageStore) -> dict:
+    """
+    Articles of the previous run keyed by story id, so unchanged stories can be carried over.
+    """
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        news = {item['id']: item for item in json.load(f)}
+    for item in news.values():
+        # articles published before the image store carried their cover inline
+        if not item['coverImage'].startswith('/'):
+            stored = image_store.put_base64(item['coverImage'])
+            item['coverImage'] = stored.cover
+            item['thumbnail'] = stored.thumbnail
+    return news
+
+
+# workers per pipeline stage, every stage mostly waits on network I/O
+STAGE_CONCURRENCY = {
+    "corpus": 4,
+    "article": 4,
+    "lead": 4,
+    "image": 2,
+}
+
+
+@dataclasses.dataclass
+class StoryJob:
+    rank: int
+    story: Story
+    # stage outputs, restored from the checkpoints of a crashed run
+    full_story: Optional[str] = None
+    article_content: Optional[str] = None
+    article_summary: Optional[str] = None
+    stored_image: Optional[dict] = None
+    # the finished article, set from the start for articles carried over from the feed
+    news_item: Optional[dict] = None
+    carried_over: bool = False
+
+
+def build_story_pipeline(
+    client: HNClient,
+    page_fetcher: PageFetcher,
+    image_store: ImageStore,
+    checkpoints: CheckpointStore,
+    run_writer: ResultWriter,
+    ledger: StoryLedger,
+) -> Pipeline:
+    """
+    corpus -> article -> lead -> image, each stage with its own worker pool.
+    Stories are expected to be judged already.
+
+    Every stage checkpoints its output and skips the work when the job already
+    carries it. Each article is appended to the run log and recorded in the
+    ledger as soon as it is finished. Carried over articles go through
+    untouched, so the limit of the pipeline applies to the feed in rank order.
+    """
+
+    def unless_finished(handler: Callable[[StoryJob], Awaitable[StoryJob]]) -> Callable[[StoryJob], Awaitable[StoryJob]]:
+        async def run(job: StoryJob) -> StoryJob:
+            if job.news_item is not None:
+                return job
+            return await handler(job)
+        return run
+
+    async def corpus(job: StoryJob) -> StoryJob:
+        print(f'generating articles for post about {job.story.title}')
+        if job.full_story is None:
+            job.full_story = await gather_full_story_corpus(client, job.story, page_fetcher)
+            checkpoints.save(job.story.id, 'full_story', job.full_story)
+        return job
+
+    async def article(job: StoryJob) -> StoryJob:
+        if job.article_content is None:
+            job.article_content = await generate_article(job.full_story)
+            checkpoints.save(job.story.id, 'article_content', job.article_content)
+        return job
+
+    async def lead(job: StoryJob) -> StoryJob:
+        if job.article_summary is None:
+            job.article_summary = await generate_lead(job.article_content)
+            checkpoints.save(job.story.id, 'article_summary', job.article_summary)
+        return job
+
+    async def image(job: StoryJob) -> StoryJob:
+        story = job.story
+        if job.stored_image is None:
+            article_img = await generate_image(job.article_summary)
+            stored_image = await asyncio.to_thread(image_store.put_base64, article_img)
+            job.stored_image = dataclasses.asdict(stored_image)
+            checkpoints.save(story.id, 'stored_image', job.stored_image)
+        stored_image = StoredImage(**job.stored_image)
+        job.news_item = json.loads(NewsItem(
+            id=str(story.id),
+            title=story.title,
+            date=datetime.datetime.fromtimestamp(story.time),
+            labels=[],
+            coverImage=stored_image.cover,
+            thumbnail=stored_image.thumbnail,
+            description=job.article_summary,
+            summary=job.article_summary,
+            content=job.article_content,
+            sources=[
+                ArticleSource(id='1',
+                            title=story.title,
+                            sourceName='HackerNews',
+                            sourceIcon='https://news.ycombinator.com/y18.svg',
+                            url=story.url or '')
+            ]
+        ).model_dump_json(by_alias=True))
+        run_writer.append(job.news_item)
+        ledger.record(story, accepted=True, article_generated=True)
+        ledger.save()
+        return job
+
+    return Pipeline([
+        Stage("corpus", unless_finished(corpus), STAGE_CONCURRENCY["corpus"]),
+        Stage("article", unless_finished(article), STAGE_CONCURRENCY["article"]),
+        Stage("lead", unless_finished(lead), STAGE_CONCURRENCY["lead"]),
+        Stage("image", unless_finished(image), STAGE_CONCURRENCY["image"]),
+    ])
+
+
 # Usage example
 async def main():
-    client = HNClient()
+    item_cache = ItemCache(CACHE_DIR.joinpath("items.sqlite3")) if USE_ITEM_CACHE else None
+    client = HNClient(cache=item_cache)
+    page_fetcher = PageFetcher(cache_dir=CACHE_DIR.joinpath("pages"))
+    ledger = StoryLedger(CACHE_DIR.joinpath("processed_stories.json"))
+    image_store = ImageStore(COVERS_PATH)
+    published_news = load_published_news(RESULT_PATH, image_store)
+    checkpoints = CheckpointStore(RUN_PATH.joinpath('checkpoints'))
+    run_writer = ResultWriter(RUN_PATH.joinpath('news.ndjson'))
+    # articles finished by a run which crashed before writing the feed
+    resumed = {item['id']: item for item in run_writer.read()}
+    if resumed:
+        print(f'resuming a previous run, {len(resumed)} articles already generated')
+    published_news.update(resumed)
     top_stories = await client.get_top_stories(50)
-    news = []
     max_stories = 10
+    rank_of = {story.id: rank for rank, story in enumerate(top_stories)}
+
+    carried_over: List[StoryJob] = []
+    to_judge: List[Story] = []
+    already_accepted: List[Story] = []
     for story in top_stories:
-        
-        try:
-            print(f'generating articles for post about {story.title}')
-            is_it_worth = filter_article(story)
-            if not is_it_worth:
-                print('skipping story due to not being of interest')
-                continue
-            full_story = await gather_full_story_corpus(client, story)
-            article_content = generate_article(full_story)
-            article_summary = generate_lead(article_content)
-            article_img = generate_image(article_summary)
-            news.append(
-            json.loads(NewsItem(
-                id=str(story.id),
-                title=story.title,
-                date=datetime.datetime.fromtimestamp(story.time),
-                labels=[],
-                coverImage=article_img,
-                description=article_summary,
-                summary=article_summary,
-                content=article_content,
-                sources=[
-                    ArticleSource(id='1',
-                                title=story.title,
-                                sourceName='HackerNews',
-                                sourceIcon='https://news.ycombinator.com/y18.svg',
-                                url=story.url or '')
-                ]
-            ).model_dump_json(by_alias=True))
-            )
-            if len(news) >= max_stories:
-                print(f'we reached the max stories {len(news)}')
-                break
-        except Exception as e:
-            print(f'there was an error while processing the story => {e}')
-        
+        published = published_news.get(str(story.id))
+        entry = ledger.get(story.id)
+        if not ledger.needs_processing(story, has_article=published is not None):
+            if published is not None:
+                carried_over.append(
+                    StoryJob(rank=rank_of[story.id], story=story, news_item=published, carried_over=True)
+                )
+        elif entry is not None and entry.accepted and not ledger.has_grown(story):
+            # accepted by an earlier run which stopped before its article was written
+            already_accepted.append(story)
+        else:
+            to_judge.append(story)
+    print(
+        f'{len(top_stories) - len(to_judge) - len(already_accepted)} stories were already '
+        f'processed and skipped, {len(already_accepted)} were accepted before'
+    )
+
+    # stories ranked below the max_stories-th carried over article can not make it to the feed
+    if len(carried_over) >= max_stories:
+        cutoff = carried_over[max_stories - 1].rank
+        to_judge = [story for story in to_judge if rank_of[story.id] < cutoff]
+        already_accepted = [story for story in already_accepted if rank_of[story.id] < cutoff]
+
+    accepted: List[Story] = []
+    if to_judge:
+        prefilter = PreFilter()
+        prefilter.train(
+            (entry.title, entry.url, entry.accepted)
+            for entry in ledger.entries.values()
+            if entry.judged_by == "llm" and entry.title is not None
+        )
+        accepted, filter_stats = await judge_stories(to_judge, ledger, prefilter)
+        print(f'filter: {filter_stats}')
+        ledger.save()
+    jobs = sorted(
+        carried_over + [
+            StoryJob(rank=rank_of[story.id], story=story, **checkpoints.load(story.id))
+            for story in already_accepted + accepted
+        ],
+        key=lambda job: job.rank,
+    )
+    pipeline = build_story_pipeline(client, page_fetcher, image_store, checkpoints, run_writer, ledger)
+    # carried over and new articles merged by rank, the first max_stories make the feed. Articles
+    # finished past them stay in the run log but are left out of the feed
+    selected: List[StoryJob] = await pipeline.run(jobs, limit=max_stories)
+    generated = [job for job in selected if not job.carried_over]
+    print(f'generated {len(generated)} articles, {len(pipeline.errors)} stage failures')
+    news = [job.news_item for job in selected]
+
     await client.close()
-    
-    path =pathlib.Path(__file__).parent.parent.joinpath('web', 'src', 'result.json')
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, 'w') as f:
-        json.dump(news, f)
+    await page_fetcher.close()
+    print(f'page fetcher: {page_fetcher.stats}')
+    await llm.close()
+    print(f'llm gateway: {llm.stats}')
+    print(f'llm response cache: {llm.cache.stats}')
+    ledger.save()
+    if item_cache is not None:
+        print(f'item cache: {item_cache.stats}')
+        item_cache.close()
+
+    write_json_atomic(RESULT_PATH, news)
+    # the feed is safely written, the next run starts from scratch
+    run_writer.clear()
+    checkpoints.clear()
+    removed = image_store.prune(
+        reference for item in news for reference in (item['coverImage'], item['thumbnail'])
+    )
+    print(f'removed {removed} unreferenced cover images')
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Small staged asyncio pipeline.
+
+Each stage owns a pool of workers reading from a bounded queue and pushing
+their output to the queue of the next stage, so a slow stage applies
+backpressure to the ones in front of it instead of letting work pile up.
+"""
+import asyncio
+import dataclasses
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+_DONE = object()
+
+
+@dataclasses.dataclass
+class Stage:
+    """
+    A pipeline step. `handler` returning `None` drops the item from the pipeline.
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Optional[Any]]]
+    concurrency: int = 1
+
+
+class Pipeline:
+    """
+    Run items through `stages`, each stage with its own worker pool.
+
+    A failing handler only drops the item it was processing. Once the first
+    `limit` items in order made it through the last stage, not counting the
+    dropped ones, every outstanding worker is cancelled.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.errors: List[Tuple[str, BaseException]] = []
+
+    async def run(self, items: Iterable[Any], limit: Optional[int] = None) -> List[Any]:
+        """
+        Returns the outputs of the last stage in the order of `items`, with a
+        `limit` the same outputs as running the items one by one until `limit`
+        of them went through.
+        """
+        queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=self.queue_size) for _ in self.stages
+        ]
+        results: List[Tuple[int, Any]] = []
+        limit_reached = asyncio.Event()
+        # whether each finished item produced an output, until the prefix passes it
+        finished: Dict[int, bool] = {}
+        # first item not finished yet, and how many outputs come before it
+        prefix = [0, 0]
+
+        def finish(index: int, produced: bool) -> None:
+            finished[index] = produced
+            while prefix[0] in finished:
+                prefix[1] += finished.pop(prefix[0])
+                prefix[0] += 1
+            if limit is not None and prefix[1] >= limit:
+                limit_reached.set()
+
+        async def feed() -> None:
+            for index, item in enumerate(items):
+                await queues[0].put((index, item))
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+
+        async def work(stage_index: int, remaining: List[int]) -> None:
+            stage = self.stages[stage_index]
+            is_last = stage_index == len(self.stages) - 1
+            while True:
+                entry = await queues[stage_index].get()
+                if entry is _DONE:
+                    break
+                index, item = entry
+                try:
+                    output = await stage.handler(item)
+                except Exception as e:
+                    print(f'stage {stage.name} failed => {e}')
+                    self.errors.append((stage.name, e))
+                    finish(index, False)
+                    continue
+                if output is None:
+                    finish(index, False)
+                    continue
+                if is_last:
+                    results.append((index, output))
+                    finish(index, True)
+                else:
+                    await queues[stage_index + 1].put((index, output))
+
+            # the last worker of a stage closes the next one
+            remaining[0] -= 1
+            if remaining[0] == 0 and not is_last:
+                for _ in range(self.stages[stage_index + 1].concurrency):
+                    await queues[stage_index + 1].put(_DONE)
+
+        tasks = [asyncio.create_task(feed())]
+        for stage_index, stage in enumerate(self.stages):
+            remaining = [stage.concurrency]
+            tasks.extend(
+                asyncio.create_task(work(stage_index, remaining))
+                for _ in range(stage.concurrency)
+            )
+
+        all_done = asyncio.gather(*tasks)
+        waiter = asyncio.create_task(limit_reached.wait())
+        try:
+            await asyncio.wait([all_done, waiter], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            waiter.cancel()
+            await asyncio.gather(*tasks, all_done, waiter, return_exceptions=True)
+
+        results.sort(key=lambda result: result[0])
+        outputs = [output for _, output in results]
+        return outputs[:limit] if limit is not None else outputs
@@ -0,0 +1,180 @@
+"""
+Cheap local scoring of stories, run before asking the LLM to judge them.
+
+The score adds keyword and domain rules derived from our readers' interests to
+a small naive Bayes model trained on the verdicts the LLM gave in earlier runs.
+Only stories scoring below `reject_threshold` are dropped: the goal is to skip
+obvious rejects, the LLM stays the judge for everything else.
+"""
+import collections
+import dataclasses
+import math
+import re
+import urllib.parse
+from typing import Counter, Dict, Iterable, List, Optional, Tuple
+
+REJECT_KEYWORDS: Dict[str, float] = {
+    "irs": -3.0,
+    "tax": -2.0,
+    "taxes": -2.0,
+    "congress": -3.0,
+    "senate": -3.0,
+    "senator": -3.0,
+    "supreme court": -3.0,
+    "election": -2.5,
+    "republican": -3.0,
+    "republicans": -3.0,
+    "democrat": -3.0,
+    "democrats": -3.0,
+    "white house": -3.0,
+    "governor": -2.0,
+    "lawsuit": -1.5,
+    "sues": -1.5,
+    "obituary": -3.0,
+    "has died": -3.0,
+    "who is hiring": -4.0,
+    "is hiring": -2.5,
+}
+
+INTEREST_KEYWORDS: Dict[str, float] = {
+    "show hn": 2.0,
+    "diy": 2.0,
+    "robot": 2.0,
+    "robotics": 2.0,
+    "automation": 1.5,
+    "automate": 1.5,
+    "electronics": 2.0,
+    "arduino": 2.0,
+    "raspberry pi": 2.0,
+    "fpga": 2.0,
+    "pcb": 2.0,
+    "game": 1.0,
+    "gaming": 1.0,
+    "startup": 1.5,
+    "founder": 1.0,
+    "biology": 1.5,
+    "battery": 1.0,
+    "engine": 1.0,
+    "open source": 1.0,
+}
+
+REJECT_DOMAINS: Dict[str, float] = {
+    "irs.gov": -4.0,
+    "congress.gov": -4.0,
+    "whitehouse.gov": -4.0,
+    "supremecourt.gov": -4.0,
+    "politico.com": -3.0,
+    "thehill.com": -3.0,
+}
+
+INTEREST_DOMAINS: Dict[str, float] = {
+    "github.com": 1.5,
+    "hackaday.com": 2.5,
+    "arxiv.org": 1.5,
+    "nature.com": 1.5,
+    "science.org": 1.5,
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _domain(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    host = urllib.parse.urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    return re.compile(r"\b" + re.escape(phrase) + r"\b")
+
+
+@dataclasses.dataclass
+class FilterStats:
+    candidates: int = 0
+    prefiltered: int = 0
+    llm_calls: int = 0
+    accepted: int = 0
+    unjudged: int = 0
+    judging_seconds: float = 0.0
+
+    @property
+    def llm_calls_saved(self) -> int:
+        # one call per story is what judging them one by one costs
+        return self.candidates - self.llm_calls
+
+    def __str__(self) -> str:
+        return (
+            f"{self.candidates} candidates, {self.prefiltered} rejected locally, "
+            f"{self.llm_calls} LLM calls ({self.llm_calls_saved} saved), "
+            f"{self.accepted} accepted, {self.unjudged} left unjudged in {self.judging_seconds:.1f}s"
+        )
+
+
+class PreFilter:
+    """
+    Rule plus naive Bayes scorer over a story's title and domain.
+
+    The model is only used once it has seen `min_training_examples` verdicts of
+    each class, its log-odds are clipped to +/- `max_model_weight`.
+    """
+
+    def __init__(
+        self,
+        reject_threshold: float = -3.0,
+        min_training_examples: int = 20,
+        max_model_weight: float = 3.0,
+    ):
+        self.reject_threshold = reject_threshold
+        self.min_training_examples = min_training_examples
+        self.max_model_weight = max_model_weight
+        self._rules: List[Tuple[re.Pattern, float]] = [
+            (_phrase_pattern(phrase), weight)
+            for phrase, weight in {**REJECT_KEYWORDS, **INTEREST_KEYWORDS}.items()
+        ]
+        self._counts: Dict[bool, Counter[str]] = {True: collections.Counter(), False: collections.Counter()}
+        self._documents: Dict[bool, int] = {True: 0, False: 0}
+
+    @staticmethod
+    def features(title: Optional[str], url: Optional[str]) -> List[str]:
+        tokens = _WORD.findall((title or "").lower())
+        domain = _domain(url)
+        if domain:
+            tokens.append(f"domain:{domain}")
+        return tokens
+
+    def train(self, examples: Iterable[Tuple[Optional[str], Optional[str], bool]]) -> None:
+        """
+        Fit the model on (title, url, accepted) verdicts.
+        """
+        for title, url, accepted in examples:
+            self._counts[accepted].update(set(self.features(title, url)))
+            self._documents[accepted] += 1
+
+    @property
+    def is_trained(self) -> bool:
+        return min(self._documents.values()) >= self.min_training_examples
+
+    def _model_log_odds(self, features: List[str]) -> float:
+        vocabulary = len(set(self._counts[True]) | set(self._counts[False]))
+        log_odds = math.log(self._documents[True] / self._documents[False])
+        for feature in set(features):
+            # Laplace smoothed Bernoulli likelihood of the feature in each class
+            p_yes = (self._counts[True][feature] + 1) / (self._documents[True] + 2)
+            p_no = (self._counts[False][feature] + 1) / (self._documents[False] + 2)
+            log_odds += math.log(p_yes / p_no)
+        scale = max(1, math.log(vocabulary + 1))
+        return max(-self.max_model_weight, min(self.max_model_weight, log_odds / scale))
+
+    def score(self, title: Optional[str], url: Optional[str]) -> float:
+        text = (title or "").lower()
+        score = sum(weight for pattern, weight in self._rules if pattern.search(text))
+        domain = _domain(url)
+        if domain:
+            score += REJECT_DOMAINS.get(domain, 0.0) + INTEREST_DOMAINS.get(domain, 0.0)
+        if self.is_trained:
+            score += self._model_log_odds(self.features(title, url))
+        return score
+
+    def is_obvious_reject(self, title: Optional[str], url: Optional[str]) -> bool:
+        return self.score(title, url) <= self.reject_threshold
@@ -0,0 +1,96 @@
+"""
+Content addressed store for the generated cover images.
+
+Images are decoded once and written under a blob directory served by the
+frontend, named after the hash of the original image, so the feed only carries
+short references instead of megabytes of base64. Every image is resized into
+variants and re-encoded as WebP.
+"""
+import base64
+import dataclasses
+import hashlib
+import io
+import os
+import pathlib
+import tempfile
+from typing import Dict, Iterable, Union
+
+from PIL import Image, features
+
+# variant name -> longest side in pixels
+DEFAULT_VARIANTS: Dict[str, int] = {
+    "cover": 1024,
+    "thumbnail": 384,
+}
+
+
+@dataclasses.dataclass
+class StoredImage:
+    cover: str
+    thumbnail: str
+
+
+class ImageStore:
+    """
+    Write images to `directory`, returning the public paths (under `public_prefix`) of their variants.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, pathlib.Path],
+        public_prefix: str = "/covers",
+        variants: Dict[str, int] = DEFAULT_VARIANTS,
+        quality: int = 80,
+    ):
+        if not features.check("webp"):
+            raise RuntimeError("Pillow was built without WebP support, cover images can not be encoded")
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.public_prefix = public_prefix.rstrip("/")
+        self.variants = variants
+        self.quality = quality
+
+    def _write(self, name: str, data: bytes) -> None:
+        path = self.directory.joinpath(name)
+        if path.exists():
+            # same name, same content
+            return
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.directory, prefix=".", suffix=".tmp", delete=False
+        ) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+    def _encode_variant(self, image: Image.Image, size: int) -> bytes:
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, format="WEBP", quality=self.quality, method=6)
+        return buffer.getvalue()
+
+    def put(self, data: bytes) -> StoredImage:
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        paths = {}
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            for variant, size in self.variants.items():
+                name = f"{digest}-{variant}.webp"
+                if not self.directory.joinpath(name).exists():
+                    self._write(name, self._encode_variant(image, size))
+                paths[variant] = f"{self.public_prefix}/{name}"
+        return StoredImage(**paths)
+
+    def put_base64(self, image_base64: str) -> StoredImage:
+        return self.put(base64.b64decode(image_base64))
+
+    def prune(self, referenced: Iterable[str]) -> int:
+        """
+        Delete the blobs no reference in `referenced` points to, returns how many were removed.
+        """
+        keep = {pathlib.PurePosixPath(reference).name for reference in referenced}
+        removed = 0
+        for path in self.directory.iterdir():
+            if path.is_file() and not path.name.startswith(".") and path.name not in keep:
+                path.unlink()
+                removed += 1
+        return removed
@@ -0,0 +1,130 @@
+"""
+Content addressed, on-disk cache of LLM responses.
+
+Responses are stored as one JSON file per request, named after the sha256 of
+(kind, model, prompt, parameters), so re-running the loader after a crash or a
+partial run replays the calls that already completed instead of paying for
+them again.
+"""
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from typing import Any, Dict, Optional, Union
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheMode(str, enum.Enum):
+    # read and write the cache
+    USE = "use"
+    # ignore cached responses but store the new ones
+    REFRESH = "refresh"
+    # neither read nor write
+    BYPASS = "bypass"
+
+    @staticmethod
+    def from_str(label: Optional[str]) -> "CacheMode":
+        if label is not None:
+            for mode in CacheMode:
+                if mode.value == label.lower():
+                    return mode
+        return CacheMode.USE
+
+
+@dataclasses.dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"hits={self.hits} misses={self.misses} "
+            f"writes={self.writes} evictions={self.evictions}"
+        )
+
+
+class ResponseCache:
+    """
+    LLM response cache bounded to `max_bytes`, evicting the least recently used entries.
+
+    Recency is tracked with file modification times, which are bumped on every hit.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, pathlib.Path],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        mode: CacheMode = CacheMode.USE,
+    ):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.stats = ResponseCacheStats()
+        self._size = sum(f.stat().st_size for f in self.directory.glob("*/*.json"))
+
+    @staticmethod
+    def key(kind: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"kind": kind, "model": model, "prompt": prompt, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory.joinpath(key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.mode != CacheMode.USE:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)["value"]
+        except (FileNotFoundError, ValueError, KeyError):
+            self.stats.misses += 1
+            return None
+        os.utime(path)
+        self.stats.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.mode == CacheMode.BYPASS:
+            return
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        previous_size = path.stat().st_size if path.exists() else 0
+        # write next to the target and rename, readers never see a partial entry
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, prefix=".", suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"value": value}, f)
+        os.replace(f.name, path)
+        self._size += path.stat().st_size - previous_size
+        self.stats.writes += 1
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is under 90% of `max_bytes`.
+        """
+        entries = sorted(
+            ((f.stat().st_mtime, f.stat().st_size, f) for f in self.directory.glob("*/*.json")),
+            key=lambda entry: entry[0],
+        )
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.stats.evictions += 1
@@ -0,0 +1,227 @@
+"""
+Async gateway for every OpenAI call made by the loader.
+
+All calls share one pooled `AsyncOpenAI` client, a cap on concurrent requests
+and token buckets for requests, tokens and images per minute. Rate limited
+calls (HTTP 429) pause the whole gateway and are retried with exponential
+backoff instead of failing the story. Responses can be replayed from a
+`ResponseCache`, in which case no request is made at all.
+"""
+import asyncio
+import dataclasses
+import random
+import time
+from typing import Any, Optional
+
+import httpx
+import openai
+
+from llm_cache import ResponseCache
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute / 60` tokens a second.
+
+    Waiters are served in arrival order; a request larger than the bucket only
+    waits for a full bucket.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+@dataclasses.dataclass
+class GatewayStats:
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    rate_limited: int = 0
+    retries: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"requests={self.requests} prompt_tokens={self.prompt_tokens} "
+            f"completion_tokens={self.completion_tokens} "
+            f"rate_limited={self.rate_limited} retries={self.retries}"
+        )
+
+
+class LLMGateway:
+    """
+    Rate limited, pooled access to the OpenAI chat and image endpoints.
+
+    `encoder` is a tiktoken encoding used to estimate how many tokens a
+    request will spend before it is sent. When `cache` is given, responses are
+    looked up there before calling the API.
+    """
+
+    def __init__(
+        self,
+        encoder: Any,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200_000,
+        images_per_minute: int = 5,
+        max_retries: int = 6,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        timeout: float = 120.0,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.encoder = encoder
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.stats = GatewayStats()
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._images = TokenBucket(images_per_minute)
+        self._resume_at = 0.0
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        # created lazily so importing the loader does not require an API key
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                max_retries=0,
+                timeout=self.timeout,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    )
+                ),
+            )
+        return self._client
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoder.encode(text))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after", ""))
+            except ValueError:
+                pass
+        if retry_after is None:
+            retry_after = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+        return retry_after + random.uniform(0, retry_after / 4)
+
+    async def _call(self, request: Any, tokens: int, is_image: bool = False) -> Any:
+        for attempt in range(self.max_retries + 1):
+            await self._requests.acquire()
+            if is_image:
+                await self._images.acquire()
+            else:
+                await self._tokens.acquire(tokens)
+
+            async with self._semaphore:
+                # honour a pause started by a rate limited call
+                pause = self._resume_at - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                try:
+                    self.stats.requests += 1
+                    return await request()
+                except openai.RateLimitError as e:
+                    self.stats.rate_limited += 1
+                    error: Exception = e
+                    delay = self._backoff(attempt, e)
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                except (openai.APIConnectionError, openai.InternalServerError) as e:
+                    error = e
+                    delay = self._backoff(attempt, e)
+
+            if attempt == self.max_retries:
+                raise error
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+
+    async def chat(
+        self,
+        prompt: str,
+        model: str = "gpt-4o-mini",
+        max_tokens: int = 600,
+        temperature: float = 0.7,
+    ) -> str:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(
+                "chat", model, prompt, {"max_tokens": max_tokens, "temperature": temperature}
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        prompt_tokens = self.count_tokens(prompt)
+
+        async def request() -> Any:
+            return await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+
+        response = await self._call(request, prompt_tokens + max_tokens)
+        if response.usage is not None:
+            self.stats.prompt_tokens += response.usage.prompt_tokens
+            self.stats.completion_tokens += response.usage.completion_tokens
+        choice = response.choices[0]
+        content = choice.message.content.strip()
+        # a truncated answer is not replayed, the next identical call asks again
+        if cache_key is not None and choice.finish_reason != "length":
+            self.cache.put(cache_key, content)
+        return content
+
+    async def image(self, prompt: str, model: str = "gpt-image-1", size: str = "1024x1024") -> str:
+        """
+        Generate an image and return it base64 encoded.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key("image", model, prompt, {"size": size})
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        async def request() -> Any:
+            return await self.client.images.generate(model=model, size=size, prompt=prompt)
+
+        result = await self._call(request, 0, is_image=True)
+        image = result.data[0].b64_json
+        if cache_key is not None:
+            self.cache.put(cache_key, image)
+        return image
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
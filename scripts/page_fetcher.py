@@ -0,0 +1,204 @@
+"""
+Shared fetcher for the pages stories link to.
+
+One pooled HTTP/2 `httpx.AsyncClient` is reused for every story. Requests are
+limited per host, bodies are streamed and abandoned past `max_bytes` or past
+the `deadline` of the whole download, non HTML responses are skipped and
+validators (ETag / Last-Modified) are kept on disk so repeated fetches can be
+answered with a 304.
+"""
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+import urllib.parse
+from collections import defaultdict
+from typing import Dict, Optional, Union
+
+import httpx
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+# seconds a whole fetch may take, the client timeouts only bound each read
+DEFAULT_DEADLINE = 30.0
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# stories leave the front page long before this, their pages are not fetched again
+DEFAULT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class PageFetchError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class FetcherStats:
+    fetched: int = 0
+    not_modified: int = 0
+    skipped_content_type: int = 0
+    truncated: int = 0
+    bytes_downloaded: int = 0
+    timed_out: int = 0
+    cache_evictions: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"fetched={self.fetched} not_modified={self.not_modified} "
+            f"skipped_content_type={self.skipped_content_type} truncated={self.truncated} "
+            f"timed_out={self.timed_out} bytes_downloaded={self.bytes_downloaded} "
+            f"cache_evictions={self.cache_evictions}"
+        )
+
+
+class PageFetcher:
+    """
+    Fetch HTML pages with pooling, per host limits, timeouts and a download cap.
+
+    Bodies larger than `max_bytes` are cut at that size. When `cache_dir` is
+    given the last complete body and validators of every url are stored there
+    and revalidated with a conditional GET. Entries unused for `cache_max_age`
+    seconds are dropped when the fetcher starts, then the least recently used
+    ones until the directory fits in `cache_max_bytes`.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_connections: int = 32,
+        per_host: int = 2,
+        timeout: httpx.Timeout = httpx.Timeout(10.0, connect=5.0),
+        deadline: float = DEFAULT_DEADLINE,
+        cache_dir: Optional[Union[str, pathlib.Path]] = None,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        cache_max_age: float = DEFAULT_CACHE_MAX_AGE,
+    ):
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.deadline = deadline
+        self.stats = FetcherStats()
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_cache(cache_max_bytes, cache_max_age)
+        self._host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host)
+        )
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            headers={"Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.1"},
+        )
+
+    def _cache_path(self, url: str) -> Optional[pathlib.Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir.joinpath(hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _prune_cache(self, max_bytes: int, max_age: float) -> None:
+        assert self.cache_dir is not None
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        total = 0
+        for mtime, size, path in entries:
+            total += size
+            if now - mtime > max_age or total > max_bytes:
+                path.unlink(missing_ok=True)
+                self.stats.cache_evictions += 1
+
+    def _load_cached(self, url: str) -> Optional[dict]:
+        path = self._cache_path(url)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+        except ValueError:
+            return None
+        # the modification time doubles as the last use for the eviction
+        os.utime(path)
+        return cached
+
+    def _store_cached(self, url: str, response: httpx.Response, text: str) -> None:
+        path = self._cache_path(url)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if path is None or (etag is None and last_modified is None):
+            return
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, prefix=".", suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"etag": etag, "last_modified": last_modified, "text": text}, f)
+        os.replace(f.name, path)
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """
+        Return the page's text, or `None` when it is not an HTML document.
+
+        Raises `PageFetchError` for HTTP errors and downloads past the
+        deadline, and `httpx.HTTPError` for transport failures and timeouts.
+        """
+        host = urllib.parse.urlparse(url).hostname or ""
+        async with self._host_limits[host]:
+            try:
+                return await asyncio.wait_for(self._fetch(url), timeout=self.deadline)
+            except asyncio.TimeoutError:
+                self.stats.timed_out += 1
+                raise PageFetchError(f"{url} took longer than {self.deadline}s") from None
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        cached = self._load_cached(url)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                self.stats.not_modified += 1
+                return cached["text"]
+            if response.is_error:
+                raise PageFetchError(f"{url} answered {response.status_code}")
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                self.stats.skipped_content_type += 1
+                return None
+
+            body = bytearray()
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) >= self.max_bytes:
+                    self.stats.truncated += 1
+                    del body[self.max_bytes :]
+                    truncated = True
+                    break
+            self.stats.fetched += 1
+            self.stats.bytes_downloaded += len(body)
+
+            text = body.decode(response.encoding or "utf-8", errors="replace")
+            # a 304 would later replay the cut body as the whole page
+            if not truncated:
+                self._store_cached(url, response, text)
+            return text
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,48 @@
+"""
+Publish the feed written by hn_loader.py to the database served by /feed.
+
+    DB_URL=postgresql://... DB_SCHEMA=news SLACK_WEBHOOK_URL=... python scripts/publish_news.py [result.json]
+
+Items are upserted by id, so publishing the same feed twice is harmless.
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from src.bff.dto import Article  # noqa: E402
+from src.bindings import Container  # noqa: E402
+from src.news.repository import NewsItem  # noqa: E402
+
+RESULT_PATH = pathlib.Path(__file__).parent.parent.joinpath('web', 'src', 'result.json')
+
+
+async def publish(path: pathlib.Path) -> None:
+    # result.json is written with camelCase keys
+    items = [
+        NewsItem.model_validate(Article.model_validate(raw).model_dump())
+        for raw in json.loads(path.read_text())
+    ]
+
+    container = Container()
+    database = container.database()
+    try:
+        await container.migration_runner().apply()
+        await container.news_service().publish(items)
+    finally:
+        await database.aclose()
+    print(f"Published {len(items)} news items from {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', type=pathlib.Path, default=RESULT_PATH)
+    args = parser.parse_args()
+    asyncio.run(publish(args.path))
+
+
+if __name__ == '__main__':
+    main()
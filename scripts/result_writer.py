@@ -0,0 +1,88 @@
+"""
+Crash safe persistence of a loader run.
+
+The output of every pipeline stage is checkpointed per story and every
+finished article is appended to an NDJSON log, so a crashed run can be
+resumed without paying again for the work already done. The JSON file the
+frontend reads is only written at the end, atomically, with the articles the
+run picked for the feed.
+"""
+import json
+import os
+import pathlib
+import tempfile
+from typing import Any, Dict, Iterator, Union
+
+
+def write_json_atomic(path: Union[str, pathlib.Path], value: Any) -> None:
+    """
+    Write `value` next to `path` and rename it into place, readers never see a partial file.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=".", suffix=".tmp", delete=False
+    ) as f:
+        json.dump(value, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
+
+
+class ResultWriter:
+    """
+    Append-only NDJSON log of the articles finished during a run.
+    """
+
+    def __init__(self, path: Union[str, pathlib.Path]):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(item) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # a crash in the middle of a write leaves a torn last line
+                    continue
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class CheckpointStore:
+    """
+    Per story checkpoints of the pipeline stage outputs, one JSON file per story.
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path]):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, story_id: int) -> pathlib.Path:
+        return self.directory.joinpath(f"{story_id}.json")
+
+    def load(self, story_id: int) -> Dict[str, Any]:
+        try:
+            with open(self._path(story_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, story_id: int, stage: str, value: Any) -> None:
+        checkpoint = self.load(story_id)
+        checkpoint[stage] = value
+        write_json_atomic(self._path(story_id), checkpoint)
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink()
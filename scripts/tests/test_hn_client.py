@@ -0,0 +1,225 @@
+"""
+HNClient story trees against the local stub server.
+
+    python -m unittest discover -s scripts/tests
+
+hn_loader builds its LLM gateway and tiktoken encoder on import, the tiktoken
+encoding is downloaded on first use.
+"""
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict
+
+SCRIPTS_DIR = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR.joinpath("benchmarks")))
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("HN_LOADER_CACHE_DIR", tempfile.mkdtemp(prefix="hn_loader_test_"))
+
+from hn_loader import Comment, HNClient, fetch_comment_tree  # noqa: E402
+from stub_hn_server import STORY_ID, StubHNServer, build_story_tree  # noqa: E402
+
+
+def comment_fields(comments: Dict[int, Comment]) -> Dict[int, tuple]:
+    return {i: (c.by, c.time, c.parent, c.text, c.kids) for i, c in comments.items()}
+
+
+def mark_deleted(items: Dict[int, Dict[str, Any]], id: int) -> None:
+    # HN keeps deleted items in the tree without author nor text
+    items[id].pop("by", None)
+    items[id].pop("text", None)
+    items[id]["deleted"] = True
+    items[STORY_ID]["descendants"] -= 1
+
+
+def add_reply(items: Dict[int, Dict[str, Any]], parent: int) -> int:
+    id = max(items) + 1
+    items[id] = {"id": id, "type": "comment", "by": "late", "time": 0, "parent": parent, "text": "reply", "kids": []}
+    items[parent]["kids"].append(id)
+    items[STORY_ID]["descendants"] += 1
+    return id
+
+
+def mark_dead(items: Dict[int, Dict[str, Any]], id: int) -> None:
+    items[id]["dead"] = True
+    items[STORY_ID]["descendants"] -= 1
+
+
+class MapAlgoliaTreeTest(unittest.TestCase):
+    def test_nested_replies_are_flattened(self) -> None:
+        node = {
+            "id": 1,
+            "type": "story",
+            "children": [
+                {
+                    "id": 2,
+                    "type": "comment",
+                    "author": "a",
+                    "created_at_i": 10,
+                    "parent_id": 1,
+                    "text": "first",
+                    "children": [
+                        {
+                            "id": 4,
+                            "type": "comment",
+                            "author": "c",
+                            "created_at_i": 12,
+                            "parent_id": 2,
+                            "text": "reply",
+                            "children": [],
+                        }
+                    ],
+                },
+                {
+                    "id": 3,
+                    "type": "comment",
+                    "author": "b",
+                    "created_at_i": 11,
+                    "parent_id": 1,
+                    "text": "second",
+                },
+            ],
+        }
+        comments: Dict[int, Comment] = {}
+
+        kids = HNClient._map_algolia_tree(node, comments)
+
+        self.assertEqual(kids, [2, 3])
+        self.assertEqual(
+            comment_fields(comments),
+            {
+                2: ("a", 10, 1, "first", [4]),
+                3: ("b", 11, 1, "second", []),
+                4: ("c", 12, 2, "reply", []),
+            },
+        )
+
+    def test_non_comment_children_are_skipped(self) -> None:
+        node = {
+            "id": 1,
+            "type": "poll",
+            "children": [
+                {"id": 2, "type": "pollopt", "text": "option", "children": []},
+                {"type": "comment", "text": "no id", "children": []},
+                {"id": 3, "type": "comment", "parent_id": 1, "text": "kept", "children": []},
+            ],
+        }
+        comments: Dict[int, Comment] = {}
+
+        self.assertEqual(HNClient._map_algolia_tree(node, comments), [3])
+        self.assertEqual(list(comments), [3])
+
+
+class GetStoryTreeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.items = build_story_tree(120)
+        self.server = StubHNServer(self.items, latency=0).__enter__()
+        self.client = HNClient(base_url=self.server.base_url, algolia_url=self.server.algolia_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        self.server.__exit__(None, None, None)
+
+    async def firebase_tree(self) -> Dict[int, Comment]:
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+        return await fetch_comment_tree(self.client, story.kids, max_depth=None, max_nodes=None)
+
+    async def test_maps_the_same_tree_as_firebase_in_one_request(self) -> None:
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+        expected = await self.firebase_tree()
+
+        self.client.request_count = 0
+        tree_story, comments = await self.client.get_story_tree(STORY_ID, story)
+
+        self.assertEqual(self.client.request_count, 1)
+        self.assertEqual(tree_story.kids, story.kids)
+        self.assertEqual(comment_fields(comments), comment_fields(expected))
+        self.assertTrue(any(comment.parent != STORY_ID for comment in comments.values()))
+
+    async def test_fetches_the_story_when_not_given(self) -> None:
+        self.client.request_count = 0
+        tree_story, comments = await self.client.get_story_tree(STORY_ID)
+
+        self.assertEqual(self.client.request_count, 2)
+        self.assertEqual(tree_story.id, STORY_ID)
+        self.assertEqual(len(comments), 120)
+
+    async def test_keeps_the_firebase_order_of_top_level_comments(self) -> None:
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+        reranked = story.model_copy(update={"kids": list(reversed(story.kids))})
+
+        tree_story, _ = await self.client.get_story_tree(STORY_ID, reranked)
+
+        self.assertEqual(tree_story.kids, reranked.kids)
+
+    async def test_deleted_comments_keep_their_replies(self) -> None:
+        deleted = next(i for i, item in self.items.items() if item["type"] == "comment" and item["kids"])
+        mark_deleted(self.items, deleted)
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+
+        self.client.request_count = 0
+        _, comments = await self.client.get_story_tree(STORY_ID, story)
+
+        self.assertEqual(self.client.request_count, 1)
+        self.assertIsNone(comments[deleted].text)
+        self.assertIsNone(comments[deleted].by)
+        self.assertEqual(comments[deleted].kids, self.items[deleted]["kids"])
+        for kid in self.items[deleted]["kids"]:
+            self.assertEqual(comments[kid].parent, deleted)
+
+    async def test_dead_comments_are_left_out(self) -> None:
+        dead_reply = next(
+            i for i, item in self.items.items() if item.get("parent", STORY_ID) != STORY_ID and not item["kids"]
+        )
+        dead_top_level = add_reply(self.items, STORY_ID)
+        mark_dead(self.items, dead_reply)
+        mark_dead(self.items, dead_top_level)
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+
+        self.client.request_count = 0
+        tree_story, comments = await self.client.get_story_tree(STORY_ID, story)
+
+        self.assertEqual(self.client.request_count, 1)
+        self.assertNotIn(dead_reply, comments)
+        self.assertNotIn(dead_reply, comments[self.items[dead_reply]["parent"]].kids)
+        self.assertNotIn(dead_top_level, comments)
+        self.assertEqual(tree_story.kids, [kid for kid in story.kids if kid != dead_top_level])
+
+    async def test_falls_back_to_firebase_when_algolia_fails(self) -> None:
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+        expected = await self.firebase_tree()
+        self.server.algolia_status = 503
+
+        self.client.request_count = 0
+        tree_story, comments = await self.client.get_story_tree(STORY_ID, story)
+
+        self.assertEqual(self.client.request_count, 1 + len(expected))
+        self.assertEqual(tree_story.kids, story.kids)
+        self.assertEqual(comment_fields(comments), comment_fields(expected))
+
+    async def test_falls_back_to_firebase_when_algolia_is_incomplete(self) -> None:
+        story = await self.client.get_story(STORY_ID)
+        assert story is not None
+        expected = await self.firebase_tree()
+        # an index lagging behind HN, a quarter of the comments are missing
+        stale = story.model_copy(update={"descendants": len(expected) * 4 // 3})
+
+        self.client.request_count = 0
+        _, comments = await self.client.get_story_tree(STORY_ID, stale)
+
+        self.assertEqual(self.client.request_count, 1 + len(expected))
+        self.assertEqual(comment_fields(comments), comment_fields(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
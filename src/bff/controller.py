@@ -1,16 +1,111 @@
+import datetime
 import logging
-from fastapi import APIRouter
 
-from src.misc.pagination import Page
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from src.bff.dto import Article, NewsItem, SearchResult
+from src.bff.feed_cache import CachedResponse, FeedCache
+from src.bindings import Container
+from src.misc.pagination import InvalidCursorError, Page, decode_cursor, encode_cursor
+from src.news.repository import FeedKey, SearchKey
+from src.news.service import NewsService
 
 _LOGGER = logging.getLogger(__file__)
 
 router = APIRouter(prefix="", tags=["backend-for-frontend"])
 
-@router.get("/feed")
+
+def _parse_feed_cursor(cursor: str) -> FeedKey:
+    try:
+        date, id = decode_cursor(cursor)
+        return datetime.datetime.fromisoformat(date), str(id)
+    except (InvalidCursorError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _feed_response(entry: CachedResponse, if_none_match: str | None) -> Response:
+    # no-cache: browsers keep the page but revalidate it on every use
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and (
+        if_none_match.strip() == "*"
+        or entry.etag
+        in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/feed", response_model=Page[NewsItem])
+@inject
 async def get_feed(
-) -> Page[str]:
+    cursor: str | None = None,
+    page_size: int = Query(default=20, ge=1, le=100),
+    include_total: bool = False,
+    if_none_match: str | None = Header(default=None),
+    news_service: NewsService = Depends(Provide[Container.news_service]),
+    feed_cache: FeedCache = Depends(Provide[Container.feed_cache]),
+) -> Response:
     _LOGGER.info("Requesting latest feed")
 
-    return Page.empty(str)
-    
+    after = _parse_feed_cursor(cursor) if cursor is not None else None
+    key = (cursor, page_size, include_total)
+    cached = feed_cache.get(key)
+    if cached is not None:
+        return _feed_response(cached, if_none_match)
+
+    # taken before reading, a publish meanwhile keeps this page out of the cache
+    version = feed_cache.version
+    items, next_key = await news_service.get_feed(page_size=page_size, after=after)
+    page = Page.of_cursor(
+        data=[NewsItem.model_validate(item.model_dump()) for item in items],
+        page_size=page_size,
+        cursor=encode_cursor(next_key) if next_key is not None else None,
+        total_count=await news_service.estimate_count() if include_total else None,
+    )
+    entry = feed_cache.put(version, key, page.model_dump_json(by_alias=True).encode())
+    return _feed_response(entry, if_none_match)
+
+
+def _parse_search_cursor(cursor: str) -> SearchKey:
+    try:
+        rank, id = decode_cursor(cursor)
+        return float(rank), str(id)
+    except (InvalidCursorError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/search")
+@inject
+async def search(
+    q: str = Query(min_length=1, max_length=256),
+    cursor: str | None = None,
+    page_size: int = Query(default=20, ge=1, le=100),
+    news_service: NewsService = Depends(Provide[Container.news_service]),
+) -> Page[SearchResult]:
+    _LOGGER.info(f"Searching articles for {q}")
+
+    hits, next_key = await news_service.search(
+        q,
+        page_size=page_size,
+        after=_parse_search_cursor(cursor) if cursor is not None else None,
+    )
+    return Page.of_cursor(
+        data=[SearchResult.model_validate(hit.model_dump()) for hit in hits],
+        page_size=page_size,
+        cursor=encode_cursor(next_key) if next_key is not None else None,
+    )
+
+
+@router.get("/articles/{id}")
+@inject
+async def get_article(
+    id: str,
+    news_service: NewsService = Depends(Provide[Container.news_service]),
+) -> Article:
+    _LOGGER.info(f"Requesting article {id}")
+
+    article = await news_service.get_article(id)
+    if article.is_nothing():
+        raise HTTPException(status_code=404, detail=f"Article {id} not found")
+    return Article.model_validate(article.unwrap().model_dump())
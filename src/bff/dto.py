@@ -1,11 +1,40 @@
-
+import datetime
 
 from src.misc.casing_utils import CamelCaseDTO
 
 
+class ArticleSource(CamelCaseDTO):
+    id: str
+    title: str
+    source_name: str
+    source_icon: str
+    url: str
+
+
 class NewsItem(CamelCaseDTO):
-    pass
+    """Feed card, only what the list shows."""
+
+    id: str
+    title: str
+    date: datetime.datetime
+    labels: list[str]
+    thumbnail: str
+    description: str
+
+
+class SearchResult(NewsItem):
+    """Feed card matching a search, with highlighted fragments of the article.
+
+    `snippet` is HTML escaped, its only markup are the <mark> tags around the matches.
+    """
+
+    snippet: str
+
 
-class Article(CamelCaseDTO):
-    pass
+class Article(NewsItem):
+    """Full article, fetched when a card is opened."""
 
+    cover_image: str
+    summary: str
+    sources: list[ArticleSource]
+    content: str
@@ -0,0 +1,114 @@
+import asyncio
+import collections
+import hashlib
+import logging
+import typing
+
+from src.database import Database
+from src.news.repository import FEED_PUBLISHED_CHANNEL
+from src.news.service import NewsService
+
+_LOGGER = logging.getLogger(__file__)
+
+
+class CachedResponse(typing.NamedTuple):
+    body: bytes
+    etag: str
+
+
+class FeedCache:
+    """LRU cache of serialized feed pages, bounded by the total size of the bodies.
+
+    Entries are keyed by the feed version, which is bumped by every publish.
+    The version is read when the cache starts and again on every
+    `FEED_PUBLISHED_CHANNEL` notification, which also drops the cached pages.
+    Until a version is known (database unreachable, listener reconnecting)
+    nothing is cached.
+    """
+
+    def __init__(
+        self,
+        news_service: NewsService,
+        database: Database,
+        schema: str,
+        max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.__news_service = news_service
+        self.__db = database
+        self.__db_schema = schema
+        self.__max_bytes = max_bytes
+
+        self.__entries: collections.OrderedDict[typing.Hashable, CachedResponse] = (
+            collections.OrderedDict()
+        )
+        self.__size = 0
+        self.__version: int | None = None
+        self.__listener_task: asyncio.Task[None] | None = None
+
+    @property
+    def version(self) -> int | None:
+        return self.__version
+
+    def start(self) -> None:
+        self.__listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self.__listener_task is not None:
+            self.__listener_task.cancel()
+            await asyncio.gather(self.__listener_task, return_exceptions=True)
+            self.__listener_task = None
+
+    def get(self, key: typing.Hashable) -> CachedResponse | None:
+        if self.__version is None:
+            return None
+        entry = self.__entries.get((self.__version, key))
+        if entry is not None:
+            self.__entries.move_to_end((self.__version, key))
+        return entry
+
+    def put(
+        self, version: int | None, key: typing.Hashable, body: bytes
+    ) -> CachedResponse:
+        """Caches `body` if it was built for the current version, returns it with its ETag."""
+        entry = CachedResponse(
+            body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        )
+        if version is None or version != self.__version or len(body) > self.__max_bytes:
+            return entry
+
+        previous = self.__entries.pop((version, key), None)
+        if previous is not None:
+            self.__size -= len(previous.body)
+        self.__entries[(version, key)] = entry
+        self.__size += len(body)
+        while self.__size > self.__max_bytes:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__size -= len(evicted.body)
+        return entry
+
+    def _set_version(self, version: int | None) -> None:
+        if version != self.__version:
+            self.__entries.clear()
+            self.__size = 0
+        self.__version = version
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with self.__db.alisten(FEED_PUBLISHED_CHANNEL) as notifications:
+                    # read after LISTEN so no publish falls in between
+                    self._set_version(await self.__news_service.get_feed_version())
+                    backoff = 1.0
+                    async for notification in notifications:
+                        if notification.payload == self.__db_schema:
+                            self._set_version(
+                                await self.__news_service.get_feed_version()
+                            )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _LOGGER.exception("Lost the feed publish listener, caching disabled")
+            self._set_version(None)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
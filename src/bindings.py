@@ -1,11 +1,20 @@
+import datetime
 import logging
+import os
+import socket
 from dependency_injector import containers, providers
 
 from src.platform_deps.slack_client import SlackClient
+from src.bff.feed_cache import FeedCache
 from src.config import Environment, settings
+from src.cron.dispatcher import CronDispatcher
+from src.cron.registry import TaskRegistry
 from src.cron.repository import CronRepository
 from src.cron.service import CronService
 from src.database import Database
+from src.migrations.runner import MigrationRunner
+from src.news.repository import NewsRepository
+from src.news.service import NewsService
 
 from pathlib import Path
 import ast
@@ -65,7 +74,15 @@ class Container(containers.DeclarativeContainer):
     )
 
     database: providers.Singleton[Database] = providers.Singleton(
-        Database, db_url=settings.db_url, dev=settings.environment == Environment.DEV
+        Database,
+        db_url=settings.db_url,
+        dev=settings.environment == Environment.DEV,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        timeout=settings.db_pool_timeout_seconds,
+        max_idle=settings.db_pool_max_idle_seconds,
+        reconnect_timeout=settings.db_pool_reconnect_timeout_seconds,
+        health_check_interval=settings.db_pool_health_check_seconds,
     )
 
     slack_client = providers.Singleton(SlackClient, url=settings.slack_webhook_url)
@@ -76,4 +93,48 @@ class Container(containers.DeclarativeContainer):
 
     cron_repository = providers.Singleton(CronRepository, database, settings.db_schema)
 
-    cron_service = providers.Factory(CronService, cron_repository)
+    cron_service = providers.Factory(
+        CronService,
+        cron_repository,
+        lease_duration=datetime.timedelta(seconds=settings.cron_task_lease_seconds),
+        retention=datetime.timedelta(days=settings.cron_task_retention_days),
+        history_retention=datetime.timedelta(
+            days=settings.cron_task_history_retention_days
+        ),
+        archive_batch_size=settings.cron_archive_batch_size,
+    )
+
+    # one TaskSpec per task type, e.g.
+    # providers.Factory(TaskSpec, task_id="generate_article",
+    #                   handler=article_service.provided.generate, max_concurrency=2)
+    cron_task_specs = providers.List()
+
+    cron_task_registry = providers.Singleton(TaskRegistry, specs=cron_task_specs)
+
+    cron_dispatcher = providers.Singleton(
+        CronDispatcher,
+        cron_service,
+        database,
+        settings.db_schema,
+        registry=cron_task_registry,
+        worker_id=f"{socket.gethostname()}-{os.getpid()}",
+        batch_size=settings.cron_dispatch_batch_size,
+        max_idle=datetime.timedelta(seconds=settings.cron_dispatch_max_idle_seconds),
+        shutdown_timeout=datetime.timedelta(
+            seconds=settings.cron_shutdown_timeout_seconds
+        ),
+    )
+
+    migration_runner = providers.Factory(MigrationRunner, database, settings.db_schema)
+
+    news_repository = providers.Singleton(NewsRepository, database, settings.db_schema)
+
+    news_service = providers.Factory(NewsService, news_repository)
+
+    feed_cache = providers.Singleton(
+        FeedCache,
+        news_service,
+        database,
+        settings.db_schema,
+        max_bytes=settings.feed_cache_max_bytes,
+    )
@@ -47,9 +47,26 @@ class AppConfig(BaseSettings):
 
     db_url: str
     db_schema: str
+    db_pool_min_size: int = 8
+    db_pool_max_size: int = 16
+    db_pool_timeout_seconds: float = 60 * 5
+    db_pool_max_idle_seconds: float = 60 * 10
+    db_pool_reconnect_timeout_seconds: float = 60 * 60
+    db_pool_health_check_seconds: float = 30
 
     slack_webhook_url: str
 
+    cron_task_lease_seconds: int = 5 * 60
+    cron_dispatch_batch_size: int = 50
+    cron_dispatch_max_idle_seconds: int = 60
+    cron_shutdown_timeout_seconds: int = 30
+    cron_task_retention_days: int = 7
+    cron_task_history_retention_days: int = 90
+    cron_archive_batch_size: int = 1_000
+    cron_archive_interval_minutes: int = 10
+
+    feed_cache_max_bytes: int = 16 * 1024 * 1024
+
     @property
     def environment(self) -> Environment:
         return Environment.from_str(os.environ.get("ENVIRONMENT"))
@@ -0,0 +1,240 @@
+import asyncio
+import collections
+import datetime
+import logging
+
+from src.cron.registry import TaskRegistry, TaskSpec
+from src.cron.repository import CronTask
+from src.cron.service import CronService
+from src.database import Database
+
+_LOGGER = logging.getLogger(__file__)
+
+# channel notified by the cron_task insert trigger, the payload is the table schema
+NOTIFY_CHANNEL = "cron_task_created"
+
+
+class CronDispatcher:
+    """Claims due cron tasks and runs them as soon as they are due.
+
+    Between drains the loop sleeps until the next `expected_by` (or expired
+    lease), capped by `max_idle`. Inserts wake it up early through the
+    `NOTIFY_CHANNEL` notifications, so new tasks are dispatched without polling.
+
+    Tasks run the handler registered for their `task_id`. Each type is only
+    claimed up to its free slots, so a saturated type does not hold back the
+    others. A handler that returns marks the task DONE; one that raises or
+    times out is rescheduled with a backoff until it runs out of attempts,
+    then marked ERROR. Types without a handler on this worker are never
+    claimed, they stay due for the workers which have one (e.g. during a
+    rolling deploy). Results are only written while the task is still held
+    by this worker.
+    """
+
+    def __init__(
+        self,
+        service: CronService,
+        database: Database,
+        schema: str,
+        worker_id: str,
+        registry: TaskRegistry,
+        batch_size: int = 50,
+        max_idle: datetime.timedelta = datetime.timedelta(minutes=1),
+        shutdown_timeout: datetime.timedelta = datetime.timedelta(seconds=30),
+    ) -> None:
+        self.__service = service
+        self.__db = database
+        self.__db_schema = schema
+        self.__worker_id = worker_id
+        self.__registry = registry
+        self.__batch_size = batch_size
+        self.__max_idle = max_idle
+        self.__shutdown_timeout = shutdown_timeout
+
+        self.__wakeup = asyncio.Event()
+        self.__stopping = asyncio.Event()
+        self.__loop_task: asyncio.Task[None] | None = None
+        self.__listener_task: asyncio.Task[None] | None = None
+        self.__running: set[asyncio.Task[None]] = set()
+        self.__in_flight: collections.Counter[str] = collections.Counter()
+
+    def start(self) -> None:
+        self.__stopping.clear()
+        self.__listener_task = asyncio.create_task(self._listen())
+        self.__loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops claiming tasks and waits for the running ones to finish.
+
+        Tasks still running after `shutdown_timeout` are cancelled, their
+        lease expires and another worker picks them up again.
+        """
+        self.__stopping.set()
+        self.__wakeup.set()
+        if self.__loop_task is not None:
+            await self.__loop_task
+        if self.__listener_task is not None:
+            self.__listener_task.cancel()
+            await asyncio.gather(self.__listener_task, return_exceptions=True)
+
+        if self.__running:
+            _, pending = await asyncio.wait(
+                self.__running, timeout=self.__shutdown_timeout.total_seconds()
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while not self.__stopping.is_set():
+            # cleared before claiming, a notification or a finished task
+            # received meanwhile still triggers the next drain
+            self.__wakeup.clear()
+            try:
+                if await self._dispatch():
+                    continue
+                timeout = await self._time_until_next_wakeup()
+            except Exception:
+                _LOGGER.exception("Failed to dispatch cron tasks")
+                timeout = self.__max_idle.total_seconds()
+
+            try:
+                await asyncio.wait_for(self.__wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self) -> bool:
+        """Claims due tasks for every type with free slots, returns whether
+        there may be more of them to claim right away.
+        """
+        more = False
+        for spec in self.__registry.specs:
+            free = spec.max_concurrency - self.__in_flight[spec.task_id]
+            if free <= 0:
+                continue
+            limit = min(free, self.__batch_size)
+            tasks = await self.__service.claim_next_available_tasks(
+                limit=limit, worker_id=self.__worker_id, task_ids=[spec.task_id]
+            )
+            for task in tasks:
+                self._spawn(spec, task)
+            more = more or (len(tasks) == limit and free > limit)
+        return more
+
+    def _spawn(self, spec: TaskSpec, task: CronTask) -> None:
+        self.__in_flight[task.task_id] += 1
+        running = asyncio.create_task(self._execute(spec, task))
+        self.__running.add(running)
+        running.add_done_callback(lambda done: self._on_done(task, done))
+
+    def _on_done(self, task: CronTask, done: asyncio.Task[None]) -> None:
+        self.__running.discard(done)
+        self.__in_flight[task.task_id] -= 1
+        # a slot was freed up
+        self.__wakeup.set()
+
+    async def _time_until_next_wakeup(self) -> float:
+        # types at capacity are claimed again once a slot frees up
+        available = [
+            spec.task_id
+            for spec in self.__registry.specs
+            if self.__in_flight[spec.task_id] < spec.max_concurrency
+        ]
+        if not available:
+            return self.__max_idle.total_seconds()
+        next_wakeup = await self.__service.get_next_wakeup(available)
+        if next_wakeup is None:
+            return self.__max_idle.total_seconds()
+        delay = next_wakeup - datetime.datetime.now(datetime.timezone.utc)
+        return max(0.0, min(delay, self.__max_idle).total_seconds())
+
+    async def _execute(self, spec: TaskSpec, task: CronTask) -> None:
+        if task.attempts > spec.max_attempts:
+            # the task kept losing its lease, its workers most likely crashed on it
+            _LOGGER.error(f"Cron task {task.id} ({task.task_id}) ran out of attempts")
+            await self._finish(task, CronTask.TaskStatusEnum.ERROR)
+            return
+
+        heartbeat = asyncio.create_task(self._keep_lease(task))
+        try:
+            await asyncio.wait_for(
+                spec.handler(task.payload), timeout=spec.timeout.total_seconds()
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _LOGGER.exception(
+                f"Cron task {task.id} ({task.task_id}) failed, attempt {task.attempts}"
+            )
+            if task.attempts >= spec.max_attempts:
+                await self._finish(task, CronTask.TaskStatusEnum.ERROR)
+            else:
+                await self._retry(
+                    task,
+                    datetime.datetime.now(datetime.timezone.utc)
+                    + spec.backoff(task.attempts),
+                )
+            return
+        finally:
+            heartbeat.cancel()
+            (result,) = await asyncio.gather(heartbeat, return_exceptions=True)
+            if isinstance(result, Exception):
+                _LOGGER.error(
+                    f"Lease heartbeat of cron task {task.id} failed", exc_info=result
+                )
+        await self._finish(task, CronTask.TaskStatusEnum.DONE)
+
+    async def _finish(self, task: CronTask, status: CronTask.TaskStatusEnum) -> None:
+        try:
+            if not await self.__service.finish_task(
+                task_id=task.id, worker_id=self.__worker_id, status=status
+            ):
+                _LOGGER.warning(
+                    f"Lost the lease of cron task {task.id}, not marking it as {status.value}"
+                )
+        except Exception:
+            # the lease expires and the task is claimed again
+            _LOGGER.exception(f"Failed to mark cron task {task.id} as {status.value}")
+
+    async def _retry(self, task: CronTask, expected_by: datetime.datetime) -> None:
+        try:
+            await self.__service.retry_task_at(
+                task_id=task.id, worker_id=self.__worker_id, expected_by=expected_by
+            )
+        except Exception:
+            _LOGGER.exception(f"Failed to reschedule cron task {task.id}")
+
+    async def _keep_lease(self, task: CronTask) -> None:
+        interval = self.__service.lease_duration.total_seconds() / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                extended = await self.__service.extend_task_lease(
+                    task_id=task.id, worker_id=self.__worker_id
+                )
+            except Exception:
+                # retried on the next beat, the lease outlives two missed ones
+                _LOGGER.exception(f"Failed to extend the lease of cron task {task.id}")
+                continue
+            if not extended:
+                _LOGGER.warning(f"Lost the lease of cron task {task.id}")
+                return
+
+    async def _listen(self) -> None:
+        """Sets the wakeup event on every insert notification, reconnecting
+        with a backoff when the listening connection drops.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                async with self.__db.alisten(NOTIFY_CHANNEL) as notifications:
+                    backoff = 1.0
+                    async for notification in notifications:
+                        if notification.payload == self.__db_schema:
+                            self.__wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _LOGGER.exception("Lost the cron task notification listener")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.__max_idle.total_seconds())
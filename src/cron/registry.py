@@ -0,0 +1,57 @@
+import datetime
+import random
+import typing
+
+import pydantic
+
+TaskHandler = typing.Callable[[dict[str, typing.Any]], typing.Awaitable[None]]
+
+
+class TaskSpec(pydantic.BaseModel):
+    """How to run the tasks of one `task_id`.
+
+    Each task type gets its own concurrency cap, so slow handlers (LLM calls)
+    only ever queue behind themselves.
+    """
+
+    task_id: str
+    handler: TaskHandler
+    max_concurrency: int = 4
+    timeout: datetime.timedelta = datetime.timedelta(minutes=5)
+    max_attempts: int = 5
+    base_backoff: datetime.timedelta = datetime.timedelta(seconds=30)
+    max_backoff: datetime.timedelta = datetime.timedelta(hours=1)
+
+    def backoff(self, attempts: int) -> datetime.timedelta:
+        """Delay before the next attempt, exponential with jitter."""
+        delay = min(self.base_backoff * 2 ** max(attempts - 1, 0), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+
+class TaskRegistry:
+    """Resolves a `CronTask.task_id` to the spec of its handler.
+
+    Specs are declared in the container (`cron_task_specs`), where handlers
+    can be bound to the methods of any other provided service.
+    """
+
+    def __init__(self, specs: typing.Sequence[TaskSpec] = ()) -> None:
+        self.__specs: dict[str, TaskSpec] = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: TaskSpec) -> None:
+        if spec.task_id in self.__specs:
+            raise ValueError(f"Handler for task {spec.task_id} already registered")
+        self.__specs[spec.task_id] = spec
+
+    def get(self, task_id: str) -> TaskSpec | None:
+        return self.__specs.get(task_id)
+
+    @property
+    def specs(self) -> list[TaskSpec]:
+        return list(self.__specs.values())
+
+    @property
+    def task_ids(self) -> list[str]:
+        return list(self.__specs.keys())
@@ -8,7 +8,8 @@ from toradh import Option, Optional
 
 from src.database import Database
 
-from psycopg.sql import SQL, Identifier, Placeholder
+from psycopg.rows import class_row, tuple_row
+from psycopg.sql import SQL, Composed, Identifier, Literal, Placeholder
 from psycopg.types.json import Jsonb
 
 
@@ -26,125 +27,544 @@ class CronTask(pydantic.BaseModel):
     task_id: str  # this should be the name of the function (AKA task) to invoke with the payload as argument
     payload: dict[str, typing.Any]
     status: TaskStatusEnum
+    claimed_by: str | None = None  # worker currently holding the task
+    lease_expires_on: datetime.datetime | None = None
+    attempts: int = 0  # number of times the task was claimed
+
+
+class NewCronTask(pydantic.BaseModel):
+    task_id: str
+    payload: dict[str, typing.Any]
+    expected_by: datetime.datetime
+
+
+def _render(query: Composed) -> bytes:
+    """Renders a composed query once, psycopg would otherwise do it on every execute."""
+    return query.as_bytes(None)
+
+
+# rows are validated by pydantic-core, which is faster than model_construct's
+# python loop for this model (see scripts/benchmarks/bench_cron_repository.py)
+_task_row = class_row(CronTask)
 
 
 class CronRepository:
+    """Queries are composed and rendered once per instance and executed as
+    prepared statements, so each call only binds and sends the parameters.
+    """
+
     TABLE_NAME = "cron_task"
+    HISTORY_TABLE_NAME = "cron_task_history"
+
+    # postgres type of every CronTask column, used to type the bulk insert arrays
+    COLUMN_TYPES = {
+        "id": "uuid",
+        "created_on": "timestamptz",
+        "updated_on": "timestamptz",
+        "expected_by": "timestamptz",
+        "task_id": "text",
+        "payload": "jsonb",
+        "status": "text",
+        "claimed_by": "text",
+        "lease_expires_on": "timestamptz",
+        "attempts": "int4",
+    }
 
     def __init__(self, db: Database, schema: str) -> None:
         self.__db = db
         self.__db_schema = schema
         self._fields = CronTask.model_fields
 
+        table = Identifier(self.__db_schema, self.TABLE_NAME)
+        history_table = Identifier(self.__db_schema, self.HISTORY_TABLE_NAME)
+        columns = SQL(" ,").join([Identifier(col) for col in self._fields.keys()])
+        self.__columns = columns
+
+        self.__insert_query = _render(
+            SQL("INSERT INTO {0} ({1}) SELECT * FROM unnest({2}) RETURNING {1}").format(
+                table,
+                columns,
+                SQL(", ").join(
+                    [
+                        SQL("{0}::{1}[]").format(
+                            Placeholder(), SQL(self.COLUMN_TYPES[col])
+                        )
+                        for col in self._fields.keys()
+                    ]
+                ),
+            )
+        )
+        self.__get_by_id_query = _render(
+            SQL("SELECT {0} FROM {1} as entity WHERE  entity.id = {2}").format(
+                columns, table, Placeholder()
+            )
+        )
+        # variants of the due tasks query, composed on first use
+        self.__due_queries: dict[tuple[str | None, bool, bool], bytes] = {}
+        self.__next_wakeup_query = _render(
+            SQL(
+                """
+                SELECT LEAST(
+                    (SELECT min(expected_by) FROM {0} WHERE status = {1} AND {3}),
+                    (SELECT min(lease_expires_on) FROM {0} WHERE status = {2} AND {3})
+                )
+                """
+            ).format(
+                table,
+                Literal(CronTask.TaskStatusEnum.CREATED.value),
+                Literal(CronTask.TaskStatusEnum.PROCESSING.value),
+                SQL("task_id = ANY(%(task_ids)s::text[])"),
+            )
+        )
+        self.__claim_queries = {
+            filtered: _render(
+                SQL(
+                    """
+                    UPDATE {0} AS entity
+                    SET status = %(processing)s,
+                        claimed_by = %(worker_id)s,
+                        lease_expires_on = %(lease_expires_on)s,
+                        updated_on = %(now)s,
+                        attempts = entity.attempts + 1
+                    WHERE entity.id IN (
+                        SELECT due.id
+                        FROM {0} AS due
+                        WHERE (
+                            (due.status = %(created)s AND due.expected_by <= %(now)s)
+                            OR (due.status = %(processing)s AND due.lease_expires_on < %(now)s)
+                        )
+                        AND {2}
+                        AND due.task_id <> ALL(%(excluded_task_ids)s::text[])
+                        ORDER BY due.expected_by
+                        LIMIT %(limit)s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {1}
+                    """
+                ).format(
+                    table,
+                    SQL(" ,").join(
+                        [
+                            SQL("entity.{0}").format(Identifier(col))
+                            for col in self._fields.keys()
+                        ]
+                    ),
+                    (
+                        SQL("due.task_id = ANY(%(task_ids)s::text[])")
+                        if filtered
+                        else SQL("1=1")
+                    ),
+                )
+            )
+            for filtered in (True, False)
+        }
+        self.__extend_lease_query = _render(
+            SQL(
+                """
+                UPDATE {0}
+                SET lease_expires_on = %s, updated_on = %s
+                WHERE id = %s AND claimed_by = %s AND status = %s
+                """
+            ).format(table)
+        )
+        self.__reschedule_query = _render(
+            SQL(
+                """
+                UPDATE {0}
+                SET status = %s, expected_by = %s, updated_on = %s,
+                    claimed_by = NULL, lease_expires_on = NULL
+                WHERE id = %s AND claimed_by = %s
+                """
+            ).format(table)
+        )
+        self.__finish_query = _render(
+            SQL(
+                """
+                UPDATE {0}
+                SET status = %s, updated_on = %s, lease_expires_on = NULL
+                WHERE id = %s AND claimed_by = %s AND status = {1}
+                """
+            ).format(table, Literal(CronTask.TaskStatusEnum.PROCESSING.value))
+        )
+        self.__update_status_query = _render(
+            SQL(
+                """
+                UPDATE {0}
+                SET {1}
+                WHERE id = %s
+                """
+            ).format(
+                table,
+                SQL(", ").join(
+                    [
+                        SQL("{0} = {1}").format(Identifier(col), Placeholder())
+                        for col in ["status", "updated_on"]
+                    ]
+                ),
+            )
+        )
+        self.__archive_query = _render(
+            SQL(
+                """
+                WITH archived AS (
+                    DELETE FROM {0}
+                    WHERE id IN (
+                        SELECT id
+                        FROM {0}
+                        WHERE status IN ({2}, {3}) AND updated_on < %s
+                        ORDER BY updated_on
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {4}
+                )
+                INSERT INTO {1} ({4})
+                SELECT {4} FROM archived
+                """
+            ).format(
+                table,
+                history_table,
+                Literal(CronTask.TaskStatusEnum.DONE.value),
+                Literal(CronTask.TaskStatusEnum.ERROR.value),
+                columns,
+            )
+        )
+        self.__purge_history_query = _render(
+            SQL(
+                """
+                DELETE FROM {0}
+                WHERE ctid IN (
+                    SELECT ctid FROM {0} WHERE updated_on < %s LIMIT %s
+                )
+                """
+            ).format(history_table)
+        )
+
     async def create_task(
         self,
         task_id: str,
         payload: dict[str, typing.Any],
         expected_by: datetime.datetime,
     ) -> CronTask:
-        task = CronTask(
-            id=uuid.uuid4(),
-            created_on=datetime.datetime.now(datetime.timezone.utc),
-            updated_on=datetime.datetime.now(datetime.timezone.utc),
-            expected_by=expected_by,
-            task_id=task_id,
-            payload=payload,
-            status=CronTask.TaskStatusEnum.CREATED,
-        )
+        return (
+            await self.create_tasks(
+                [NewCronTask(task_id=task_id, payload=payload, expected_by=expected_by)]
+            )
+        )[0]
 
-        async with self.__db.aget_session(dict[str, uuid.UUID]) as session:
-            content_id_dict = await (
-                await session.execute(
-                    SQL(
-                        "INSERT INTO {0} ({1}) VALUES ({2}) RETURNING id AS id",
-                    ).format(
-                        Identifier(self.__db_schema, self.TABLE_NAME),
-                        SQL(" ,").join(
-                            [Identifier(col) for col in self._fields.keys()]
-                        ),
-                        SQL(", ").join(
-                            [Placeholder() for _ in range(len(self._fields))]
-                        ),
-                    ),
+    async def create_tasks(
+        self, new_tasks: typing.Sequence[NewCronTask], chunk_size: int = 10_000
+    ) -> list[CronTask]:
+        """Inserts a batch of tasks, one statement per `chunk_size` tasks.
+
+        Every column is sent as an array and expanded with `unnest`, so the
+        statement text does not depend on the batch size, and the stored rows
+        come back from RETURNING instead of being selected again. All the
+        chunks are inserted in a single transaction.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        tasks = [
+            CronTask(
+                id=uuid.uuid4(),
+                created_on=now,
+                updated_on=now,
+                expected_by=new_task.expected_by,
+                task_id=new_task.task_id,
+                payload=new_task.payload,
+                status=CronTask.TaskStatusEnum.CREATED,
+            )
+            for new_task in new_tasks
+        ]
+
+        persisted: dict[uuid.UUID, CronTask] = {}
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=_task_row)
+            for start in range(0, len(tasks), chunk_size):
+                chunk = tasks[start : start + chunk_size]
+                await cursor.execute(
+                    self.__insert_query,
                     tuple(
                         [
-                            self._map_field_to_column_value(getattr(task, attr))
+                            [
+                                self._map_field_to_column_value(getattr(task, attr))
+                                for task in chunk
+                            ]
                             for attr in self._fields
                         ]
                     ),
+                    prepare=True,
                 )
-            ).fetchone()
+                persisted.update((row.id, row) for row in await cursor.fetchall())
             await session.commit()
-            assert content_id_dict
-            content_id = content_id_dict["id"]
-
-            persisted_entity = await self.get_by_id(content_id)
 
-            return typing.cast(CronTask, persisted_entity.unwrap())
+        # RETURNING does not promise the input order
+        return [persisted[task.id] for task in tasks]
 
     async def get_by_id(self, id: uuid.UUID) -> Optional[CronTask]:
-        async with self.__db.aget_session(CronTask) as session:
-            result = await (
-                await session.execute(
-                    SQL("SELECT {0} FROM {1} as entity WHERE  entity.id = {2}").format(
-                        SQL(" ,").join(
-                            [Identifier(col) for col in self._fields.keys()]
-                        ),
-                        Identifier(self.__db_schema, self.TABLE_NAME),
-                        Placeholder(),
-                    ),
-                    (id,),
-                )
-            ).fetchone()
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=_task_row)
+            await cursor.execute(self.__get_by_id_query, (id,), prepare=True)
+            result = await cursor.fetchone()
         return Option.of(result)
 
     async def get_by_run_date(
-        self, run_date: datetime.datetime, status: CronTask.TaskStatusEnum | None
+        self,
+        run_date: datetime.datetime,
+        status: CronTask.TaskStatusEnum | None,
+        limit: int = 1_000,
+        after: tuple[datetime.datetime, uuid.UUID] | None = None,
     ) -> list[CronTask]:
-        async with self.__db.aget_session(CronTask) as session:
-            result = await (
-                await session.execute(
-                    SQL(
-                        """
-                        SELECT {0} 
-                        FROM {1} as entity 
-                        WHERE  entity.expected_by <= {2}
-                        AND {3}
-                        """
-                    ).format(
-                        SQL(" ,").join(
-                            [Identifier(col) for col in self._fields.keys()]
-                        ),
-                        Identifier(self.__db_schema, self.TABLE_NAME),
-                        Placeholder(),
-                        SQL("entity.status = %s") if status is not None else SQL("1=1"),
+        """Returns up to `limit` tasks due by `run_date`, ordered by (expected_by, id).
+
+        Pass the (expected_by, id) of the last task of a page as `after` to get
+        the next one; the partial index on CREATED tasks serves both the filter
+        and the ordering.
+        """
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=_task_row)
+            await cursor.execute(
+                self._due_tasks_query(status, after is not None, True),
+                self._due_tasks_params(run_date, after, limit),
+                prepare=True,
+            )
+            result = await cursor.fetchall()
+        return result
+
+    async def iter_by_run_date(
+        self,
+        run_date: datetime.datetime,
+        status: CronTask.TaskStatusEnum | None,
+        batch_size: int = 500,
+    ) -> typing.AsyncIterator[CronTask]:
+        """Streams every task due by `run_date` through a server-side cursor.
+
+        Only `batch_size` rows are held in memory at a time. The cursor keeps
+        a pooled connection and its transaction open until the iteration ends,
+        so consumers should not hold on to it longer than needed.
+        """
+        async with self.__db.aget_session(None) as session:
+            async with session.cursor(
+                name="cron_task_due", row_factory=_task_row
+            ) as cursor:
+                cursor.itersize = batch_size
+                await cursor.execute(
+                    self._due_tasks_query(status, False, False),
+                    self._due_tasks_params(run_date, None, None),
+                )
+                async for task in cursor:
+                    yield task
+            await session.rollback()
+
+    def _due_tasks_query(
+        self,
+        status: CronTask.TaskStatusEnum | None,
+        paginated: bool,
+        limited: bool,
+    ) -> bytes:
+        key = (status.value if status is not None else None, paginated, limited)
+        if key not in self.__due_queries:
+            self.__due_queries[key] = _render(
+                SQL(
+                    """
+                    SELECT {0}
+                    FROM {1} as entity
+                    WHERE entity.expected_by <= %(run_date)s
+                    AND {2}
+                    AND {3}
+                    ORDER BY entity.expected_by, entity.id
+                    {4}
+                    """
+                ).format(
+                    self.__columns,
+                    Identifier(self.__db_schema, self.TABLE_NAME),
+                    # inlined so the planner can match the partial index predicate
+                    (
+                        SQL("entity.status = {0}").format(Literal(status.value))
+                        if status is not None
+                        else SQL("1=1")
                     ),
-                    (run_date, status) if status is not None else (run_date,),
+                    (
+                        SQL(
+                            "(entity.expected_by, entity.id) > (%(after_date)s, %(after_id)s)"
+                        )
+                        if paginated
+                        else SQL("1=1")
+                    ),
+                    SQL("LIMIT %(limit)s") if limited else SQL(""),
                 )
-            ).fetchall()
+            )
+        return self.__due_queries[key]
+
+    def _due_tasks_params(
+        self,
+        run_date: datetime.datetime,
+        after: tuple[datetime.datetime, uuid.UUID] | None,
+        limit: int | None,
+    ) -> dict[str, typing.Any]:
+        params: dict[str, typing.Any] = {"run_date": run_date}
+        if after is not None:
+            params["after_date"], params["after_id"] = after
+        if limit is not None:
+            params["limit"] = limit
+        return params
+
+    async def get_next_wakeup(
+        self, task_ids: typing.Sequence[str]
+    ) -> datetime.datetime | None:
+        """Returns when the next task becomes claimable: the earliest pending
+        `expected_by` or expired lease, None when there is nothing to wait for.
+
+        Only tasks whose `task_id` is in `task_ids` are considered.
+        """
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=tuple_row)
+            await cursor.execute(
+                self.__next_wakeup_query,
+                {"task_ids": list(task_ids)},
+                prepare=True,
+            )
+            result = await cursor.fetchone()
+        return result[0] if result is not None else None
+
+    async def claim_due_tasks(
+        self,
+        limit: int,
+        worker_id: str,
+        lease_duration: datetime.timedelta,
+        task_ids: typing.Sequence[str] | None = None,
+        excluded_task_ids: typing.Sequence[str] = (),
+    ) -> list[CronTask]:
+        """Atomically claims up to `limit` due tasks for `worker_id`.
+
+        Due CREATED tasks and PROCESSING tasks whose lease expired (their
+        worker crashed) are locked with `FOR UPDATE SKIP LOCKED`, so concurrent
+        workers never claim the same row, and moved to PROCESSING in the same
+        statement. Every claim counts as an attempt. Only tasks whose `task_id`
+        is in `task_ids` (when given) and not in `excluded_task_ids` are claimed.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=_task_row)
+            await cursor.execute(
+                self.__claim_queries[task_ids is not None],
+                {
+                    "processing": CronTask.TaskStatusEnum.PROCESSING,
+                    "created": CronTask.TaskStatusEnum.CREATED,
+                    "worker_id": worker_id,
+                    "lease_expires_on": now + lease_duration,
+                    "now": now,
+                    "limit": limit,
+                    "task_ids": list(task_ids or []),
+                    "excluded_task_ids": list(excluded_task_ids),
+                },
+                prepare=True,
+            )
+            result = await cursor.fetchall()
+            await session.commit()
         return result
 
+    async def extend_lease(
+        self, task_id: uuid.UUID, worker_id: str, lease_duration: datetime.timedelta
+    ) -> bool:
+        """Pushes back the lease of a task still held by `worker_id`.
+
+        Returns False when the lease was lost (expired and claimed by someone else).
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        async with self.__db.aget_session(None) as session:
+            cursor = await session.execute(
+                self.__extend_lease_query,
+                (
+                    now + lease_duration,
+                    now,
+                    task_id,
+                    worker_id,
+                    CronTask.TaskStatusEnum.PROCESSING,
+                ),
+                prepare=True,
+            )
+            await session.commit()
+        return cursor.rowcount == 1
+
+    async def reschedule(
+        self, task_id: uuid.UUID, worker_id: str, expected_by: datetime.datetime
+    ) -> None:
+        """Releases a task held by `worker_id` back to CREATED, due at `expected_by`."""
+        async with self.__db.aget_session(None) as session:
+            await session.execute(
+                self.__reschedule_query,
+                (
+                    CronTask.TaskStatusEnum.CREATED,
+                    expected_by,
+                    datetime.datetime.now(datetime.timezone.utc),
+                    task_id,
+                    worker_id,
+                ),
+                prepare=True,
+            )
+            await session.commit()
+
+    async def finish(
+        self, task_id: uuid.UUID, worker_id: str, status: CronTask.TaskStatusEnum
+    ) -> bool:
+        """Sets the final `status` of a task still held by `worker_id`.
+
+        Returns False when the lease was lost, the result of the worker which
+        claimed the task since then is left untouched.
+        """
+        async with self.__db.aget_session(None) as session:
+            cursor = await session.execute(
+                self.__finish_query,
+                (
+                    status,
+                    datetime.datetime.now(datetime.timezone.utc),
+                    task_id,
+                    worker_id,
+                ),
+                prepare=True,
+            )
+            await session.commit()
+        return cursor.rowcount == 1
+
     async def update_status(
         self, task_id: uuid.UUID, status: CronTask.TaskStatusEnum
     ) -> None:
         async with self.__db.aget_session(None) as session:
             await session.execute(
-                SQL(""" 
-                    UPDATE {0}
-                    SET {1}
-                    WHERE id = %s
-                    """).format(
-                    Identifier(self.__db_schema, self.TABLE_NAME),
-                    SQL(", ").join(
-                        [
-                            SQL("{0} = {1}").format(Identifier(col), Placeholder())
-                            for col in ["status", "updated_on"]
-                        ]
-                    ),
-                ),
+                self.__update_status_query,
                 tuple([status, datetime.datetime.now(datetime.timezone.utc), task_id]),
+                prepare=True,
+            )
+            await session.commit()
+
+    async def archive_finished(
+        self, finished_before: datetime.datetime, batch_size: int
+    ) -> int:
+        """Moves up to `batch_size` DONE or ERROR tasks last updated before
+        `finished_before` to the history table, in one short transaction.
+
+        Rows are locked with `SKIP LOCKED`, so the batch never waits on the
+        dispatcher. Returns the number of archived tasks.
+        """
+        async with self.__db.aget_session(None) as session:
+            cursor = await session.execute(
+                self.__archive_query, (finished_before, batch_size), prepare=True
+            )
+            await session.commit()
+        return cursor.rowcount
+
+    async def purge_history(
+        self, finished_before: datetime.datetime, batch_size: int
+    ) -> int:
+        """Deletes up to `batch_size` history rows last updated before `finished_before`."""
+        async with self.__db.aget_session(None) as session:
+            cursor = await session.execute(
+                self.__purge_history_query,
+                (finished_before, batch_size),
+                prepare=True,
             )
             await session.commit()
+        return cursor.rowcount
 
     def _map_field_to_column_value(self, field: typing.Any) -> typing.Any:
         match field:
@@ -1,12 +1,23 @@
 import datetime
 import typing
 import uuid
-from src.cron.repository import CronRepository, CronTask
+from src.cron.repository import CronRepository, CronTask, NewCronTask
 
 
 class CronService:
-    def __init__(self, repository: CronRepository) -> None:
+    def __init__(
+        self,
+        repository: CronRepository,
+        lease_duration: datetime.timedelta = datetime.timedelta(minutes=5),
+        retention: datetime.timedelta = datetime.timedelta(days=7),
+        history_retention: datetime.timedelta = datetime.timedelta(days=90),
+        archive_batch_size: int = 1_000,
+    ) -> None:
         self.repository = repository
+        self.lease_duration = lease_duration
+        self.retention = retention
+        self.history_retention = history_retention
+        self.archive_batch_size = archive_batch_size
 
     async def add_task(
         self, task: str, payload: dict[str, typing.Any], expected_by: datetime.datetime
@@ -15,13 +26,96 @@ class CronService:
             task_id=task, payload=payload, expected_by=expected_by
         )
 
-    async def get_next_available_tasks(self) -> list[CronTask]:
+    async def add_tasks(self, tasks: typing.Sequence[NewCronTask]) -> list[CronTask]:
+        return await self.repository.create_tasks(tasks)
+
+    async def get_next_available_tasks(
+        self,
+        limit: int = 1_000,
+        after: tuple[datetime.datetime, uuid.UUID] | None = None,
+    ) -> list[CronTask]:
         return await self.repository.get_by_run_date(
             run_date=datetime.datetime.now(datetime.timezone.utc),
             status=CronTask.TaskStatusEnum.CREATED,
+            limit=limit,
+            after=after,
+        )
+
+    def iter_next_available_tasks(
+        self, batch_size: int = 500
+    ) -> typing.AsyncIterator[CronTask]:
+        return self.repository.iter_by_run_date(
+            run_date=datetime.datetime.now(datetime.timezone.utc),
+            status=CronTask.TaskStatusEnum.CREATED,
+            batch_size=batch_size,
+        )
+
+    async def get_next_wakeup(
+        self, task_ids: typing.Sequence[str]
+    ) -> datetime.datetime | None:
+        return await self.repository.get_next_wakeup(task_ids)
+
+    async def claim_next_available_tasks(
+        self,
+        limit: int,
+        worker_id: str,
+        task_ids: typing.Sequence[str] | None = None,
+        excluded_task_ids: typing.Sequence[str] = (),
+    ) -> list[CronTask]:
+        return await self.repository.claim_due_tasks(
+            limit=limit,
+            worker_id=worker_id,
+            lease_duration=self.lease_duration,
+            task_ids=task_ids,
+            excluded_task_ids=excluded_task_ids,
+        )
+
+    async def retry_task_at(
+        self, task_id: uuid.UUID, worker_id: str, expected_by: datetime.datetime
+    ) -> None:
+        await self.repository.reschedule(
+            task_id=task_id, worker_id=worker_id, expected_by=expected_by
+        )
+
+    async def extend_task_lease(self, task_id: uuid.UUID, worker_id: str) -> bool:
+        return await self.repository.extend_lease(
+            task_id=task_id, worker_id=worker_id, lease_duration=self.lease_duration
+        )
+
+    async def finish_task(
+        self, task_id: uuid.UUID, worker_id: str, status: CronTask.TaskStatusEnum
+    ) -> bool:
+        return await self.repository.finish(
+            task_id=task_id, worker_id=worker_id, status=status
         )
 
     async def update_task_status(
         self, task_id: uuid.UUID, status: CronTask.TaskStatusEnum
     ) -> None:
         await self.repository.update_status(task_id=task_id, status=status)
+
+    async def archive_finished_tasks(self) -> int:
+        """Moves finished tasks older than `retention` to the history table and
+        drops history older than `history_retention`, one small batch at a time
+        so the hot table is never locked for long.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        archived = 0
+        while True:
+            moved = await self.repository.archive_finished(
+                finished_before=now - self.retention,
+                batch_size=self.archive_batch_size,
+            )
+            archived += moved
+            if moved < self.archive_batch_size:
+                break
+
+        while (
+            await self.repository.purge_history(
+                finished_before=now - self.history_retention,
+                batch_size=self.archive_batch_size,
+            )
+            == self.archive_batch_size
+        ):
+            pass
+        return archived
@@ -1,46 +1,141 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 import typing
 from contextlib import asynccontextmanager, contextmanager
 from typing import AsyncIterator, Generator, Type, TypeVar, overload
 
-from psycopg import AsyncConnection, Connection
-from psycopg.rows import class_row
+from psycopg import AsyncConnection, Connection, Notify
+from psycopg.rows import class_row, tuple_row
+from psycopg.sql import SQL, Identifier
 from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
+from src.misc.casing_utils import CamelCaseDTO
+
 # from src.core.config import Environment, settings
 
 
 _T = TypeVar("_T")
 
 
+class PoolStats(CamelCaseDTO):
+    """Session usage since start up, times in milliseconds."""
+
+    checkouts: int = 0
+    in_use: int = 0
+    errors: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    checkout_ms_total: float = 0.0
+    checkout_ms_max: float = 0.0
+    health_check_failures: int = 0
+    # psycopg_pool's own counters for the async pool (pool_size, requests_waiting...)
+    pool: dict[str, int] = {}
+
+
 class Database:
     """Database abstraction layer which
     handles the session management as well as database connection.
+
+    Pooled connections are not checked on checkout: a background task checks
+    the idle ones every `health_check_interval` seconds instead, so a session
+    costs a single round trip whatever the size of the pool.
     """
 
-    def __init__(self, db_url: str, dev: bool = False) -> None:
+    def __init__(
+        self,
+        db_url: str,
+        dev: bool = False,
+        min_size: int = 8,
+        max_size: int | None = None,
+        timeout: float = 60 * 5,
+        max_idle: float = 60 * 10,
+        reconnect_timeout: float = 60 * 60,
+        health_check_interval: float = 30,
+    ) -> None:
         self.__logger = logging.getLogger(self.__class__.__name__)
         self.__dev = dev
+        self.__db_url = db_url
+        self.__health_check_interval = health_check_interval
+        self.__health_check_task: asyncio.Task[None] | None = None
+        self.__stats = PoolStats()
 
         self.__connection_pool = ConnectionPool(
             conninfo=db_url,
-            timeout=60 * 5,
-            reconnect_timeout=60 * 60,
+            timeout=timeout,
+            max_idle=max_idle,
+            reconnect_timeout=reconnect_timeout,
             open=(
                 False if self.__dev else True
             ),  # do not starts the connection pool immediately if test environment.
+            min_size=min_size,
+            max_size=max_size,
         )
 
         self.__async_connection_pool = AsyncConnectionPool(
             conninfo=db_url,
-            timeout=60 * 5,
-            reconnect_timeout=60 * 60,
+            timeout=timeout,
+            max_idle=max_idle,
+            reconnect_timeout=reconnect_timeout,
             open=False,
-            min_size=8,
+            min_size=min_size,
+            max_size=max_size,
         )
 
+    async def aopen(self) -> None:
+        """Opens the async pool and starts the background health checks."""
+        if not self.__async_connection_pool._opened:
+            await self.__async_connection_pool.open(wait=True)
+        if self.__health_check_task is None:
+            self.__health_check_task = asyncio.create_task(self._check_health())
+
+    async def aclose(self) -> None:
+        if self.__health_check_task is not None:
+            self.__health_check_task.cancel()
+            await asyncio.gather(self.__health_check_task, return_exceptions=True)
+            self.__health_check_task = None
+        await self.__async_connection_pool.close()
+        await asyncio.to_thread(self.__connection_pool.close)
+
+    def stats(self) -> PoolStats:
+        stats = self.__stats.model_copy()
+        stats.pool = self.__async_connection_pool.get_stats()
+        return stats
+
+    async def _check_health(self) -> None:
+        """Periodically replaces the broken idle connections of both pools."""
+        while True:
+            await asyncio.sleep(self.__health_check_interval)
+            try:
+                await self.__async_connection_pool.check()
+                if self.__connection_pool._opened:
+                    await asyncio.to_thread(self.__connection_pool.check)
+            except Exception:
+                self.__stats.health_check_failures += 1
+                self.__logger.exception("Connection pool health check failed")
+
+    @contextmanager
+    def _track_checkout(self, requested_at: float) -> Generator[None, None, None]:
+        acquired_at = time.perf_counter()
+        wait_ms = (acquired_at - requested_at) * 1000
+        stats = self.__stats
+        stats.checkouts += 1
+        stats.in_use += 1
+        stats.wait_ms_total += wait_ms
+        stats.wait_ms_max = max(stats.wait_ms_max, wait_ms)
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            checkout_ms = (time.perf_counter() - acquired_at) * 1000
+            stats.in_use -= 1
+            stats.checkout_ms_total += checkout_ms
+            stats.checkout_ms_max = max(stats.checkout_ms_max, checkout_ms)
+
     @overload
     @contextmanager
     def get_session(self, t: None) -> Generator[Connection[typing.Any], None, None]: ...
@@ -57,13 +152,13 @@ class Database:
         if not self.__connection_pool._opened:
             self.__connection_pool.open()
 
-        self.__connection_pool.check()
-
+        requested_at = time.perf_counter()
         session = self.__connection_pool.getconn()
 
         try:
-            session.row_factory = class_row(t) if t is not None else session.row_factory  # type: ignore
-            yield session
+            with self._track_checkout(requested_at):
+                session.row_factory = class_row(t) if t is not None else tuple_row  # type: ignore
+                yield session
         except Exception as e:
             self.__logger.exception("Session rollback because of exception")
             session.rollback()
@@ -86,21 +181,36 @@ class Database:
     ) -> AsyncIterator[AsyncConnection[_T] | AsyncConnection[typing.Any]]:
         # checks for an open connection, if not then opens the connection pool
         if not self.__async_connection_pool._opened:
-            await self.__async_connection_pool.open(wait=True)
-
-        await self.__async_connection_pool.check()
+            await self.aopen()
 
+        requested_at = time.perf_counter()
         async with self.__async_connection_pool.connection() as session:
             try:
-                session.row_factory = (
-                    class_row(t) if t is not None else session.row_factory  # type: ignore
-                )
-                if t is None:
-                    yield session
-                else:
-                    yield typing.cast(AsyncConnection[_T], session)
+                with self._track_checkout(requested_at):
+                    session.row_factory = (
+                        class_row(t) if t is not None else tuple_row  # type: ignore
+                    )
+                    if t is None:
+                        yield session
+                    else:
+                        yield typing.cast(AsyncConnection[_T], session)
 
             except Exception as e:
                 self.__logger.exception("Session rollback because of exception")
                 await session.rollback()
                 raise e
+
+    @asynccontextmanager
+    async def alisten(self, channel: str) -> AsyncIterator[AsyncIterator[Notify]]:
+        """LISTENs on `channel` and yields the stream of its notifications.
+
+        Uses a dedicated autocommit connection outside of the pool: it stays
+        idle for as long as the listener lives and notifications are only
+        delivered outside of a transaction.
+        """
+        connection = await AsyncConnection.connect(self.__db_url, autocommit=True)
+        try:
+            await connection.execute(SQL("LISTEN {0}").format(Identifier(channel)))
+            yield connection.notifies()
+        finally:
+            await connection.close()
@@ -0,0 +1,19 @@
+import logging
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+
+from src.bindings import Container
+from src.database import Database, PoolStats
+
+_LOGGER = logging.getLogger(__file__)
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/database")
+@inject
+async def get_database_health(
+    database: Database = Depends(Provide[Container.database]),
+) -> PoolStats:
+    return database.stats()
@@ -3,6 +3,9 @@ import logging
 import typing
 from fastapi import APIRouter, FastAPI
 from src.bindings import Container
+from src.config import settings
+from src.bff.controller import router as bff_router
+from src.health.controller import router as health_router
 from apscheduler.schedulers.asyncio import AsyncIOScheduler  # type: ignore
 from apscheduler.triggers.interval import IntervalTrigger  # type: ignore
 
@@ -24,19 +27,40 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> typing.AsyncGenerator[None, None]:
+    container: Container = getattr(app, "container")
+    await container.database().aopen()
+    await container.migration_runner().apply()
+
     # Create and start the AsyncIOScheduler
     scheduler = AsyncIOScheduler()
     scheduler.start()
 
     # Schedule the async task to run every 10 minutes
+    scheduler.add_job(
+        container.cron_service().archive_finished_tasks,
+        IntervalTrigger(minutes=settings.cron_archive_interval_minutes),
+        max_instances=1,
+        coalesce=True,
+    )
+
+    dispatcher = container.cron_dispatcher()
+    dispatcher.start()
+
+    feed_cache = container.feed_cache()
+    feed_cache.start()
 
     yield
     print("Shutting down scheduler...")
+    await dispatcher.stop()
+    await feed_cache.stop()
     scheduler.shutdown()
+    await container.database().aclose()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(app_router)
+app.include_router(health_router)
+app.include_router(bff_router)
 
 setattr(app, "container", Container())
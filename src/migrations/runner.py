@@ -0,0 +1,83 @@
+import logging
+import pathlib
+
+from psycopg.sql import SQL, Identifier, Literal
+
+from src.database import Database
+
+_LOGGER = logging.getLogger(__file__)
+
+MIGRATIONS_DIR = pathlib.Path(__file__).parent / "sql"
+
+# arbitrary key, serializes concurrent migration runs across instances
+_MIGRATION_LOCK_ID = 7_310_245
+
+
+class MigrationRunner:
+    """Applies the SQL files in `MIGRATIONS_DIR` in lexical order, once each.
+
+    Files are formatted with psycopg's `SQL.format`, `{schema}` is replaced
+    by the configured schema; literal braces must be doubled (`'{{}}'`).
+    Applied versions are tracked in `<schema>.schema_migrations`.
+    """
+
+    def __init__(
+        self, db: Database, schema: str, migrations_dir: pathlib.Path = MIGRATIONS_DIR
+    ) -> None:
+        self.__db = db
+        self.__db_schema = schema
+        self.__migrations_dir = migrations_dir
+
+    async def apply(self) -> list[str]:
+        applied: list[str] = []
+        async with self.__db.aget_session(None) as session:
+            async with session.transaction():
+                await session.execute(
+                    SQL("SELECT pg_advisory_xact_lock({0})").format(
+                        Literal(_MIGRATION_LOCK_ID)
+                    )
+                )
+                await session.execute(
+                    SQL("CREATE SCHEMA IF NOT EXISTS {0}").format(
+                        Identifier(self.__db_schema)
+                    )
+                )
+                await session.execute(
+                    SQL(
+                        """
+                        CREATE TABLE IF NOT EXISTS {0} (
+                            version TEXT PRIMARY KEY,
+                            applied_on TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                        """
+                    ).format(Identifier(self.__db_schema, "schema_migrations"))
+                )
+                done = {
+                    row[0]
+                    for row in await (
+                        await session.execute(
+                            SQL("SELECT version FROM {0}").format(
+                                Identifier(self.__db_schema, "schema_migrations")
+                            )
+                        )
+                    ).fetchall()
+                }
+
+                for path in sorted(self.__migrations_dir.glob("*.sql")):
+                    version = path.stem
+                    if version in done:
+                        continue
+                    _LOGGER.info(f"Applying migration {version}")
+                    await session.execute(
+                        SQL(path.read_text()).format(
+                            schema=Identifier(self.__db_schema)
+                        )
+                    )
+                    await session.execute(
+                        SQL("INSERT INTO {0} (version) VALUES (%s)").format(
+                            Identifier(self.__db_schema, "schema_migrations")
+                        ),
+                        (version,),
+                    )
+                    applied.append(version)
+        return applied
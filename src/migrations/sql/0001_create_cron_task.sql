@@ -0,0 +1,12 @@
+-- baseline, the table already exists on deployments created before migrations
+CREATE SCHEMA IF NOT EXISTS {schema};
+
+CREATE TABLE IF NOT EXISTS {schema}.cron_task (
+    id UUID PRIMARY KEY,
+    created_on TIMESTAMPTZ NOT NULL,
+    updated_on TIMESTAMPTZ NOT NULL,
+    expected_by TIMESTAMPTZ NOT NULL,
+    task_id TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL
+);
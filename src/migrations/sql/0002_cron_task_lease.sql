@@ -0,0 +1,4 @@
+-- tasks are claimed by a worker for a limited time, expired leases can be claimed again
+ALTER TABLE {schema}.cron_task
+    ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_on TIMESTAMPTZ;
@@ -0,0 +1,4 @@
+-- due task lookups only look at CREATED rows, ordered by (expected_by, id) for keyset pagination
+CREATE INDEX IF NOT EXISTS cron_task_due_idx
+    ON {schema}.cron_task (expected_by, id)
+    WHERE status = 'CREATED';
@@ -0,0 +1,17 @@
+-- wakes up the cron dispatchers as soon as tasks are inserted, once per statement
+CREATE OR REPLACE FUNCTION {schema}.notify_cron_task_created() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cron_task_created', TG_TABLE_SCHEMA);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cron_task_created ON {schema}.cron_task;
+CREATE TRIGGER cron_task_created
+    AFTER INSERT ON {schema}.cron_task
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema}.notify_cron_task_created();
+
+-- the dispatcher sleeps until the next lease expires as well
+CREATE INDEX IF NOT EXISTS cron_task_lease_idx
+    ON {schema}.cron_task (lease_expires_on)
+    WHERE status = 'PROCESSING';
@@ -0,0 +1,3 @@
+-- failed tasks are retried with a backoff until they run out of attempts
+ALTER TABLE {schema}.cron_task
+    ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
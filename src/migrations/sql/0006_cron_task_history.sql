@@ -0,0 +1,13 @@
+-- finished tasks are moved out of the hot table once past the retention window,
+-- columns added to cron_task later must be added here as well
+CREATE TABLE IF NOT EXISTS {schema}.cron_task_history (
+    LIKE {schema}.cron_task INCLUDING DEFAULTS,
+    archived_on TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS cron_task_history_updated_on_idx
+    ON {schema}.cron_task_history (updated_on);
+
+CREATE INDEX IF NOT EXISTS cron_task_finished_idx
+    ON {schema}.cron_task (updated_on)
+    WHERE status IN ('DONE', 'ERROR');
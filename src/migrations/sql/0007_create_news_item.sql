@@ -0,0 +1,18 @@
+-- published news, the feed pages through them newest first on (date, id)
+CREATE TABLE IF NOT EXISTS {schema}.news_item (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    date TIMESTAMPTZ NOT NULL,
+    labels TEXT[] NOT NULL,
+    cover_image TEXT NOT NULL,
+    thumbnail TEXT NOT NULL,
+    description TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    sources JSONB NOT NULL,
+    content TEXT NOT NULL,
+    created_on TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_on TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS news_item_feed_idx
+    ON {schema}.news_item (date DESC, id DESC);
@@ -0,0 +1,19 @@
+-- the feed only reads the card columns, heavy article fields live in their own table
+CREATE TABLE IF NOT EXISTS {schema}.news_article (
+    id TEXT PRIMARY KEY REFERENCES {schema}.news_item (id) ON DELETE CASCADE,
+    cover_image TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    sources JSONB NOT NULL,
+    content TEXT NOT NULL
+);
+
+INSERT INTO {schema}.news_article (id, cover_image, summary, sources, content)
+SELECT id, cover_image, summary, sources, content
+FROM {schema}.news_item
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE {schema}.news_item
+    DROP COLUMN cover_image,
+    DROP COLUMN summary,
+    DROP COLUMN sources,
+    DROP COLUMN content;
@@ -0,0 +1,9 @@
+-- bumped by every publish, the API caches feed pages per version
+CREATE TABLE IF NOT EXISTS {schema}.news_feed_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL
+);
+
+INSERT INTO {schema}.news_feed_version (id, version)
+VALUES (TRUE, 1)
+ON CONFLICT (id) DO NOTHING;
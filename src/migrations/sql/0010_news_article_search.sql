@@ -0,0 +1,21 @@
+-- full text search over the articles, title ranks above description, summary and content.
+-- generated columns only see their own row, so the article keeps copies of title and description
+ALTER TABLE {schema}.news_article
+    ADD COLUMN IF NOT EXISTS title TEXT NOT NULL DEFAULT '',
+    ADD COLUMN IF NOT EXISTS description TEXT NOT NULL DEFAULT '';
+
+UPDATE {schema}.news_article AS article
+SET title = item.title, description = item.description
+FROM {schema}.news_item AS item
+WHERE item.id = article.id;
+
+ALTER TABLE {schema}.news_article
+    ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A')
+        || setweight(to_tsvector('english', description), 'B')
+        || setweight(to_tsvector('english', summary), 'C')
+        || setweight(to_tsvector('english', content), 'D')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS news_article_search_idx
+    ON {schema}.news_article USING GIN (search_vector);
@@ -16,15 +16,13 @@ class CamelCaseDTO(pydantic.BaseModel):
     will expect both request and response to
     have camelCasing.
     """
-    
+
     if pydantic.__version__.startswith("2"):
         model_config = pydantic.ConfigDict(
-            populate_by_name=True, 
-            alias_generator=to_lower_camel_case
+            populate_by_name=True, alias_generator=to_lower_camel_case
         )
     else:
 
         class Config:
             alias_generator = to_lower_camel_case
             allow_population_by_field_name = True
-
@@ -1,3 +1,5 @@
+import base64
+import json
 import typing
 
 from src.misc.casing_utils import CamelCaseDTO
@@ -27,6 +29,22 @@ class Page(CamelCaseDTO, typing.Generic[T]):
             ),
         )
 
+    @staticmethod
+    def of_cursor(
+        data: list[V],
+        page_size: int,
+        cursor: str | None,
+        total_count: int | None = None,
+    ) -> "Page[V]":
+        return Page(
+            data=data,
+            pagination=PaginationMetadata(
+                total_count=total_count,
+                page_size=page_size,
+                cursor=cursor,
+            ),
+        )
+
     @staticmethod
     def empty(type: typing.Type[V]) -> "Page[V]":
         data: list[type] = []
@@ -37,9 +55,31 @@ class Page(CamelCaseDTO, typing.Generic[T]):
 
 
 class PaginationMetadata(CamelCaseDTO):
-    total_count: int
+    total_count: int | None = None  # may be an estimate, None when not requested
     page_size: int
     offset: int = 0
+    cursor: str | None = None  # opaque, fetches the next page, None on the last one
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(key: typing.Sequence[typing.Any]) -> str:
+    """Encodes the keyset position of the last item of a page as an opaque token."""
+    return base64.urlsafe_b64encode(
+        json.dumps(list(key), default=str).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> list[typing.Any]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as e:
+        raise InvalidCursorError(f"Invalid cursor {cursor}") from e
+    if not isinstance(key, list):
+        raise InvalidCursorError(f"Invalid cursor {cursor}")
+    return key
 
 
-Page.model_rebuild()
\ No newline at end of file
+Page.model_rebuild()
@@ -0,0 +1,302 @@
+import datetime
+import html
+import typing
+
+import pydantic
+from psycopg.rows import class_row, tuple_row
+from psycopg.sql import SQL, Composed, Identifier, Literal
+from psycopg.types.json import Jsonb
+from toradh import Option, Optional
+
+from src.database import Database
+
+
+class NewsSource(pydantic.BaseModel):
+    id: str
+    title: str
+    source_name: str
+    source_icon: str
+    url: str
+
+
+class NewsCard(pydantic.BaseModel):
+    """What the feed shows of an item, stored in `news_item`."""
+
+    id: str
+    title: str
+    date: datetime.datetime
+    labels: list[str]
+    thumbnail: str
+    description: str
+
+
+class NewsItem(NewsCard):
+    """A whole published item, the heavy fields are stored in `news_article`."""
+
+    cover_image: str
+    summary: str
+    sources: list[NewsSource]
+    content: str
+
+
+# notified on publish with the schema as payload, once the new items are committed
+FEED_PUBLISHED_CHANNEL = "news_feed_published"
+
+# position of an item in the feed, the feed is ordered by (date, id) descending
+FeedKey = tuple[datetime.datetime, str]
+
+
+class NewsSearchHit(NewsCard):
+    rank: float
+    # best matching fragments of the content, HTML escaped with the matches wrapped in <mark>
+    snippet: str
+
+
+# position of a hit in the search results, ordered by (rank, id) descending
+SearchKey = tuple[float, str]
+
+SEARCH_LANGUAGE = "english"
+
+# private use characters delimiting the matches in ts_headline's output, the
+# content is escaped before they are turned into <mark> tags
+_MATCH_START = "\ue000"
+_MATCH_STOP = "\ue001"
+
+
+def _highlight(headline: str) -> str:
+    """Escapes a raw `ts_headline` and wraps its matches in <mark> tags."""
+    return (
+        html.escape(headline)
+        .replace(_MATCH_START, "<mark>")
+        .replace(_MATCH_STOP, "</mark>")
+    )
+
+
+class NewsRepository:
+    TABLE_NAME = "news_item"
+    ARTICLE_TABLE_NAME = "news_article"
+    VERSION_TABLE_NAME = "news_feed_version"
+
+    def __init__(self, db: Database, schema: str) -> None:
+        self.__db = db
+        self.__db_schema = schema
+        self._card_fields = list(NewsCard.model_fields.keys())
+        self._body_fields = [
+            col
+            for col in NewsItem.model_fields.keys()
+            if col not in NewsCard.model_fields
+        ]
+        # title and description are copied to the article for its search vector
+        self._article_fields = ["id", "title", "description"] + self._body_fields
+
+        table = Identifier(self.__db_schema, self.TABLE_NAME)
+        article_table = Identifier(self.__db_schema, self.ARTICLE_TABLE_NAME)
+        card_columns = SQL(" ,").join([Identifier(col) for col in self._card_fields])
+        self.__upsert_card_query = self._upsert_query(
+            table, self._card_fields, SQL(", updated_on = now()")
+        )
+        self.__upsert_article_query = self._upsert_query(
+            article_table, self._article_fields, SQL("")
+        )
+        self.__first_page_query = SQL(
+            """
+            SELECT {0}
+            FROM {1}
+            ORDER BY date DESC, id DESC
+            LIMIT %(limit)s
+            """
+        ).format(card_columns, table)
+        # row comparison, served by the (date DESC, id DESC) index at any depth
+        self.__next_page_query = SQL(
+            """
+            SELECT {0}
+            FROM {1}
+            WHERE (date, id) < (%(date)s, %(id)s)
+            ORDER BY date DESC, id DESC
+            LIMIT %(limit)s
+            """
+        ).format(card_columns, table)
+        self.__get_by_id_query = SQL(
+            """
+            SELECT {0}
+            FROM {1} AS card
+            JOIN {2} AS article ON article.id = card.id
+            WHERE card.id = %s
+            """
+        ).format(
+            SQL(" ,").join(
+                [SQL("card.{0}").format(Identifier(col)) for col in self._card_fields]
+                + [
+                    SQL("article.{0}").format(Identifier(col))
+                    for col in self._body_fields
+                ]
+            ),
+            table,
+            article_table,
+        )
+        self.__search_queries = {
+            paginated: SQL(
+                """
+                WITH search AS (
+                    SELECT websearch_to_tsquery({3}, %(query)s) AS query
+                ),
+                hits AS (
+                    SELECT article.id, ts_rank(article.search_vector, search.query)::real AS rank
+                    FROM {2} AS article, search
+                    WHERE article.search_vector @@ search.query
+                    AND {4}
+                    ORDER BY rank DESC, article.id DESC
+                    LIMIT %(limit)s
+                )
+                SELECT {0}, hits.rank,
+                    ts_headline({3}, article.content, search.query, {5}) AS snippet
+                FROM hits
+                JOIN {1} AS card ON card.id = hits.id
+                JOIN {2} AS article ON article.id = hits.id, search
+                ORDER BY hits.rank DESC, hits.id DESC
+                """
+            ).format(
+                SQL(" ,").join(
+                    [
+                        SQL("card.{0}").format(Identifier(col))
+                        for col in self._card_fields
+                    ]
+                ),
+                table,
+                article_table,
+                Literal(SEARCH_LANGUAGE),
+                (
+                    SQL(
+                        "(ts_rank(article.search_vector, search.query)::real, article.id)"
+                        " < (%(rank)s::real, %(id)s)"
+                    )
+                    if paginated
+                    else SQL("1=1")
+                ),
+                # headlines are only computed for the rows of the page
+                Literal(
+                    "MaxFragments=2, MaxWords=30, MinWords=10, "
+                    f'StartSel="{_MATCH_START}", StopSel="{_MATCH_STOP}"'
+                ),
+            )
+            for paginated in (True, False)
+        }
+        version_table = Identifier(self.__db_schema, self.VERSION_TABLE_NAME)
+        self.__get_version_query = SQL("SELECT version FROM {0}").format(version_table)
+        self.__bump_version_query = SQL(
+            """
+            UPDATE {0} SET version = version + 1;
+            SELECT pg_notify({1}, {2});
+            """
+        ).format(
+            version_table,
+            Literal(FEED_PUBLISHED_CHANNEL),
+            Literal(self.__db_schema),
+        )
+        # planner estimate, kept up to date by autovacuum, no table scan
+        self.__estimated_count_query = SQL(
+            "SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE oid = {0}::regclass"
+        ).format(Literal(table.as_string(None)))
+
+    def _upsert_query(
+        self, table: Identifier, fields: list[str], extra_set: SQL
+    ) -> Composed:
+        return SQL(
+            """
+            INSERT INTO {0} ({1})
+            VALUES ({2})
+            ON CONFLICT (id) DO UPDATE
+            SET {3}{4}
+            """
+        ).format(
+            table,
+            SQL(" ,").join([Identifier(col) for col in fields]),
+            SQL(", ").join([SQL("%s")] * len(fields)),
+            SQL(", ").join(
+                [
+                    SQL("{0} = EXCLUDED.{0}").format(Identifier(col))
+                    for col in fields
+                    if col != "id"
+                ]
+            ),
+            extra_set,
+        )
+
+    async def upsert_many(self, items: typing.Sequence[NewsItem]) -> None:
+        rows = [self._to_row(item) for item in items]
+        async with self.__db.aget_session(None) as session:
+            async with session.cursor() as cursor:
+                await cursor.executemany(
+                    self.__upsert_card_query,
+                    [tuple(row[col] for col in self._card_fields) for row in rows],
+                )
+                await cursor.executemany(
+                    self.__upsert_article_query,
+                    [tuple(row[col] for col in self._article_fields) for row in rows],
+                )
+                await cursor.execute(self.__bump_version_query)
+            await session.commit()
+
+    async def get_page(
+        self, limit: int, after: FeedKey | None = None
+    ) -> list[NewsCard]:
+        """Returns up to `limit` cards, newest first, following `after` when given."""
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=class_row(NewsCard))
+            if after is None:
+                await cursor.execute(
+                    self.__first_page_query, {"limit": limit}, prepare=True
+                )
+            else:
+                await cursor.execute(
+                    self.__next_page_query,
+                    {"date": after[0], "id": after[1], "limit": limit},
+                    prepare=True,
+                )
+            return await cursor.fetchall()
+
+    async def get_by_id(self, id: str) -> Optional[NewsItem]:
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=class_row(NewsItem))
+            await cursor.execute(self.__get_by_id_query, (id,), prepare=True)
+            result = await cursor.fetchone()
+        return Option.of(result)
+
+    async def search(
+        self, query: str, limit: int, after: SearchKey | None = None
+    ) -> list[NewsSearchHit]:
+        """Returns up to `limit` articles matching `query` (web search syntax),
+        best ranked first, following `after` when given.
+        """
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=class_row(NewsSearchHit))
+            params: dict[str, typing.Any] = {"query": query, "limit": limit}
+            if after is not None:
+                params["rank"], params["id"] = after
+            await cursor.execute(
+                self.__search_queries[after is not None], params, prepare=True
+            )
+            hits = await cursor.fetchall()
+        # the headline is cut from the raw content, markup included
+        for hit in hits:
+            hit.snippet = _highlight(hit.snippet)
+        return hits
+
+    async def get_version(self) -> int:
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=tuple_row)
+            await cursor.execute(self.__get_version_query, prepare=True)
+            result = await cursor.fetchone()
+        return int(result[0]) if result is not None else 0
+
+    async def estimate_count(self) -> int:
+        async with self.__db.aget_session(None) as session:
+            cursor = session.cursor(row_factory=tuple_row)
+            await cursor.execute(self.__estimated_count_query, prepare=True)
+            result = await cursor.fetchone()
+        return int(result[0]) if result is not None else 0
+
+    def _to_row(self, item: NewsItem) -> dict[str, typing.Any]:
+        row = item.model_dump()
+        row["sources"] = Jsonb(row["sources"])
+        return row
@@ -0,0 +1,51 @@
+import typing
+
+from toradh import Optional
+
+from src.news.repository import (
+    FeedKey,
+    NewsCard,
+    NewsItem,
+    NewsRepository,
+    NewsSearchHit,
+    SearchKey,
+)
+
+
+class NewsService:
+    def __init__(self, repository: NewsRepository) -> None:
+        self.repository = repository
+
+    async def publish(self, items: typing.Sequence[NewsItem]) -> None:
+        await self.repository.upsert_many(items)
+
+    async def get_feed(
+        self, page_size: int, after: FeedKey | None = None
+    ) -> tuple[list[NewsCard], FeedKey | None]:
+        """Returns a page of the feed and the key to continue from, None on the last page."""
+        # one extra row tells whether there is a next page, without counting
+        items = await self.repository.get_page(limit=page_size + 1, after=after)
+        if len(items) <= page_size:
+            return items, None
+        items = items[:page_size]
+        return items, (items[-1].date, items[-1].id)
+
+    async def search(
+        self, query: str, page_size: int, after: SearchKey | None = None
+    ) -> tuple[list[NewsSearchHit], SearchKey | None]:
+        """Returns a page of search hits and the key to continue from, None on the last page."""
+        hits = await self.repository.search(query, limit=page_size + 1, after=after)
+        if len(hits) <= page_size:
+            return hits, None
+        hits = hits[:page_size]
+        return hits, (hits[-1].rank, hits[-1].id)
+
+    async def get_article(self, id: str) -> Optional[NewsItem]:
+        return await self.repository.get_by_id(id)
+
+    async def get_feed_version(self) -> int:
+        """Current version of the feed, bumped by every publish."""
+        return await self.repository.get_version()
+
+    async def estimate_count(self) -> int:
+        return await self.repository.estimate_count()
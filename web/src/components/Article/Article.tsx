@@ -26,7 +26,7 @@ export default function Article() {
         </CardHeader>
         <CardContent>
           <img
-            src={`data:image/jpeg;base64,${news.coverImage}`}
+            src={news.coverImage}
             alt={news.title}
             width={800}
             height={400}
@@ -19,8 +19,9 @@ export default function NewsFeed() {
                 <div className="md:w-1/3">
                 
                   <img
-                    src={`data:image/jpeg;base64,${item.coverImage}`}
+                    src={item.thumbnail}
                     alt={item.title}
+                    loading="lazy"
                     className="object-contain"
                   />
                 </div>
@@ -13,6 +13,7 @@ export interface NewsItem {
   date: string;
   labels: string[];
   coverImage: string;
+  thumbnail: string;
   description: string;
   summary: string;
   sources: ArticleSource[];